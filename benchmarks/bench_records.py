@@ -0,0 +1,90 @@
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import synthetic
+from catalog import FIELDS, JSON_FIELDS, ORDER, Catalog
+
+# Memory held by the loaded library: the per-title dicts the catalog used to
+# hand back (every column, intro included, versions keyed by their own copy
+# of each path) against CatalogRecords.  The catalog is written straight from
+# synthetic titles, no folder walk, and read back once for the time and once
+# with tracemalloc running for the memory.
+
+
+def write_catalog(path, count, rng):
+    games = {}
+    # make_titles counts files, a title has about three.
+    for base_id, name, region, names in synthetic.make_titles(count * 5, rng)[:count]:
+        game = {'id': base_id, 'name': name, 'region': region, 'rank': rng.randint(1, 50000),
+                'size': rng.randint(1, 16) << 30, 'intro': f"{name} intro text. " * 3,
+                'iconUrl': f"https://example.invalid/icons/{base_id}.jpg", 'versions': {}}
+        for file_type in ('base', 'update', 'dlc'):
+            game[file_type] = []
+        for file_type, file_name in names:
+            file_path = f"/mnt/library/{file_type}/{file_name}"
+            game[file_type].append(file_path)
+            game['versions'][file_path] = 0
+        games[base_id[:-3]] = game
+    catalog = Catalog(path)
+    catalog.save(games, replace=True)
+    catalog.close()
+
+
+def load_dicts(catalog):
+    # What Catalog.load() returned before records.
+    columns = ', '.join(f'"{column}"' for column in ('key',) + FIELDS + tuple(JSON_FIELDS))
+    files = {}
+    for row in catalog.conn.execute(f"SELECT {columns} FROM titles ORDER BY {ORDER}"):
+        game = dict(zip(FIELDS, row[1:1 + len(FIELDS)]))
+        for (field, empty), value in zip(JSON_FIELDS.items(), row[1 + len(FIELDS):]):
+            game[field] = json.loads(value) if value else empty()
+        files[row[0]] = game
+    return files
+
+
+def measure(load):
+    start = time.perf_counter()
+    files = load()
+    seconds = time.perf_counter() - start
+    del files
+    tracemalloc.start()
+    files = load()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return files, seconds, current, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--titles', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    for count in args.titles:
+        workdir = tempfile.mkdtemp(prefix='emurom-bench-')
+        try:
+            path = os.path.join(workdir, 'catalog.sqlite')
+            write_catalog(path, count, random.Random(args.seed))
+            catalog = Catalog(path)
+            print(f"{count} titles")
+            for label, load in (('dicts', lambda: load_dicts(catalog)), ('records', catalog.load)):
+                files, seconds, current, peak = measure(load)
+                print(f"  {label:<8} {current / (1 << 20):7.1f} MiB held  {peak / (1 << 20):7.1f} MiB peak  "
+                      f"{current / len(files):6.0f} B/title  {seconds:.2f}s")
+                del files
+            catalog.close()
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+import os
+import sys
+import time
+import random
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from thefuzz import fuzz, process
+from search_index import SearchIndex
+
+# Per-keystroke search latency: the old process.extract over every choice
+# against SearchIndex, at several library sizes.
+
+WORDS = ("monster hunter rise super mario bros wonder zelda legend tears kingdom "
+         "pokemon scarlet violet kirby forgotten land metroid dread animal crossing "
+         "new horizons splatoon fire emblem engage xenoblade chronicles octopath "
+         "traveler bayonetta hollow knight celeste hades dead cells stardew valley "
+         "layered armor piece sleeves mask pack deluxe edition season pass").split()
+
+
+def make_choices(count, rng):
+    choices = {}
+    for i in range(count):
+        name = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(2, 6))).title()
+        titleid = f"0100{i:09X}000"
+        choices[titleid[:-3]] = f"{name} {titleid}"
+    return choices
+
+
+def keystrokes(query):
+    return [query[:i] for i in range(1, len(query) + 1)]
+
+
+def measure(fn, queries):
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        fn(query)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def report(label, timings):
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f"  {label:<8} median {statistics.median(timings) * 1000:8.2f} ms   p95 {p95 * 1000:8.2f} ms   max {timings[-1] * 1000:8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--queries', nargs='+', default=['monster huntr', 'zelda tears', '0100000001'])
+    parser.add_argument('--skip-legacy', action='store_true', help='only time the index')
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    queries = [q for query in args.queries for q in keystrokes(query)]
+    for size in args.sizes:
+        choices = make_choices(size, rng)
+        start = time.perf_counter()
+        index = SearchIndex()
+        index.rebuild(choices)
+        index.ensure_built()
+        print(f"{size} titles, index built in {time.perf_counter() - start:.2f}s, {len(queries)} keystrokes")
+        report('index', measure(lambda q: index.search(q, 100), queries))
+        if not args.skip_legacy:
+            report('legacy', measure(lambda q: process.extract(q, choices, limit=100, scorer=fuzz.partial_token_sort_ratio), queries))
+
+
+if __name__ == '__main__':
+    main()
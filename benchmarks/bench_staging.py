@@ -0,0 +1,136 @@
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from staging import BufferTuner, InputStager
+from transfer_queue import TransferJob, volume_of
+
+# Building off a network share.  The share is simulated by an opener that
+# charges every read a fixed round trip plus its size over a bandwidth cap;
+# the build by a consumer that reads its inputs in `buffer_size` blocks and
+# spends a fixed time per byte "decompressing".  Three ways to run the same
+# jobs one after another:
+#
+#   direct        64 KiB reads straight off the share, as before
+#   direct_tuned  reads off the share with BufferTuner picking the block size
+#   staged        InputStager copying every job's inputs ahead, the build
+#                 reading the local copy, so job N+1 streams in during job N
+#
+# The share is throttled in this process only; local reads run at disk speed.
+
+
+class ThrottledFile:
+    def __init__(self, path, latency, bandwidth):
+        self.file = open(path, 'rb')
+        self.latency = latency
+        self.bandwidth = bandwidth
+
+    def read(self, size=-1):
+        data = self.file.read(size)
+        time.sleep(self.latency + len(data) / self.bandwidth)
+        return data
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.file.close()
+
+
+def consume(path, buffer_size, decompress_rate, opener=None, tuner=None):
+    handle = opener(path, 'rb') if opener else open(path, 'rb')
+    with handle as file:
+        total = 0
+        while True:
+            size = tuner.buffer_size('share', default=buffer_size) if tuner else buffer_size
+            start = time.perf_counter()
+            block = file.read(size)
+            if tuner:
+                tuner.observe('share', len(block), time.perf_counter() - start)
+            if not block:
+                break
+            total += len(block)
+            time.sleep(len(block) / decompress_rate)
+    return total
+
+
+def make_jobs(share, output, jobs, size):
+    made = []
+    for i in range(jobs):
+        path = os.path.join(share, f"Game {i}[0100{i:09X}000][US][v0].nsz")
+        with open(path, 'wb') as file:
+            for _ in range(size >> 20):
+                file.write(os.urandom(1 << 20))
+        made.append(TransferJob(f"{i}", f"Game {i}", [path], output))
+    return made
+
+
+def run(scenario, jobs, share, scratch, args):
+    def opener(path, mode):
+        return ThrottledFile(path, args.latency, args.bandwidth)
+
+    start = time.perf_counter()
+    if scenario == 'direct':
+        for job in jobs:
+            for path in job.files:
+                consume(path, 64 * 1024, args.decompress, opener=opener)
+        return time.perf_counter() - start, 64 * 1024
+    if scenario == 'direct_tuned':
+        tuner = BufferTuner()
+        for job in jobs:
+            for path in job.files:
+                consume(path, 64 * 1024, args.decompress, opener=opener, tuner=tuner)
+        return time.perf_counter() - start, tuner.buffer_size('share')
+
+    stager = InputStager(budget=args.budget, scratch_root=scratch, opener=opener,
+                         remote=lambda path: path.startswith(share))
+    try:
+        for job in jobs:
+            stager.prefetch(job)
+        for job in jobs:
+            files = stager.acquire(job)
+            for path in files:
+                consume(path, 64 * 1024, args.decompress)
+            stager.release(job)
+        elapsed = time.perf_counter() - start
+        return elapsed, stager.tuner.buffer_size(volume_of(jobs[0].files[0]))
+    finally:
+        stager.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--jobs', type=int, default=3)
+    parser.add_argument('--size-mb', type=int, default=32, help='input size per job')
+    parser.add_argument('--latency', type=float, default=0.002, help='share round trip per read, seconds')
+    parser.add_argument('--bandwidth', type=float, default=100e6, help='share bandwidth, bytes per second')
+    parser.add_argument('--decompress', type=float, default=300e6, help='build speed, bytes per second')
+    parser.add_argument('--budget', type=int, default=8 << 30, help='staging scratch budget in bytes')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='emurom-bench-')
+    try:
+        share = os.path.join(workdir, 'share')
+        output = os.path.join(workdir, 'output')
+        os.makedirs(share)
+        os.makedirs(output)
+        jobs = make_jobs(share, output, args.jobs, args.size_mb << 20)
+        total = args.jobs * (args.size_mb << 20)
+        print(f"{args.jobs} jobs x {args.size_mb} MiB, share {args.latency * 1000:.1f} ms + "
+              f"{args.bandwidth / 1e6:.0f} MB/s, build {args.decompress / 1e6:.0f} MB/s")
+        baseline = None
+        for scenario in ('direct', 'direct_tuned', 'staged'):
+            elapsed, buffer_size = run(scenario, jobs, share, workdir, args)
+            baseline = baseline or elapsed
+            print(f"  {scenario:<13} {elapsed:6.2f}s  {total / elapsed / 1e6:6.1f} MB/s  "
+                  f"block {buffer_size >> 10} KiB  {baseline / elapsed:4.1f}x")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
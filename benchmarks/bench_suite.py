@@ -0,0 +1,286 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import statistics
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import synthetic
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# End to end timings for the library hot paths on synthetic libraries:
+#
+#   scan          FileManager.scan_files over the whole tree
+#   refresh_cold  update_library into an empty data folder: parse, titles DB
+#                 build and merge, sort, catalog write
+#   refresh_warm  update_library again with nothing changed
+#   load_data     reading the whole catalog at startup
+#   first_page    reading the first screenful, what the window waits for
+#   search        one SearchIndex.search per keystroke of a few queries
+#   paging        VirtualList page by page over the library, with the
+#                 treeview stubbed so no display is needed
+#
+# Every stage runs in its own process, in order, against the same scratch
+# folder, so peak RSS can be reported per stage.  Results are written as JSON;
+# given --baseline (an earlier results file) or thresholds.json budgets, the
+# run exits non-zero on a regression.
+
+STAGES = ('scan', 'refresh_cold', 'refresh_warm', 'load_data', 'first_page', 'search', 'paging')
+QUERIES = ('monster hunter', 'zelda tears', 'hollow', '0100000000A')
+PAGE_ROWS = 30
+MAX_PAGES = 2000
+# Differences smaller than these are noise, whatever the percentage.
+NOISE_FLOOR = {'seconds': 0.05, 'p95_ms': 2.0, 'peak_rss_mb': 16}
+THRESHOLDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'thresholds.json')
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, KiB elsewhere.
+    return peak / (1 << 20) if sys.platform == 'darwin' else peak / 1024
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+    return {
+        'p50_ms': round(statistics.median(ordered) * 1000, 3),
+        'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 3),
+        'max_ms': round(ordered[-1] * 1000, 3),
+    }
+
+
+class StubTreeview:
+    def __init__(self, height):
+        self.height = height
+        self.items = {}
+        self.selected = ()
+        self.ids = 0
+
+    def cget(self, option):
+        return self.height
+
+    def bind(self, *args):
+        pass
+
+    def insert(self, parent, index):
+        self.ids += 1
+        iid = f"I{self.ids}"
+        self.items[iid] = None
+        return iid
+
+    def delete(self, iid):
+        self.items.pop(iid, None)
+
+    def item(self, iid, **values):
+        self.items[iid] = values
+
+    def selection_set(self, items):
+        self.selected = items
+
+    def selection(self):
+        return self.selected
+
+
+class StubScrollbar:
+    def configure(self, **options):
+        pass
+
+    def set(self, first, last):
+        pass
+
+
+def file_manager(data_dir):
+    from file_manager import FileManager
+    manager = FileManager(data_dir=data_dir)
+    # Never reach for the network from a benchmark.
+    manager.titles_db_max_age = None
+    return manager
+
+
+def run_stage(stage, data_dir, library):
+    rss_before = peak_rss_mb()
+    result = {}
+    if stage == 'scan':
+        manager = file_manager(data_dir)
+        start = time.perf_counter()
+        found = sum(1 for _ in manager.scan_files(library))
+        result.update(seconds=time.perf_counter() - start, files=found)
+    elif stage in ('refresh_cold', 'refresh_warm'):
+        if stage == 'refresh_cold':
+            # Everything but titles.json itself, so repeats stay cold.
+            for name in ('catalog.sqlite', 'catalog.sqlite-wal', 'catalog.sqlite-shm', 'scan_index.json',
+                         os.path.join('titledb', 'titles.sqlite')):
+                if os.path.exists(os.path.join(data_dir, name)):
+                    os.remove(os.path.join(data_dir, name))
+        manager = file_manager(data_dir)
+        manager.load_data()
+        start = time.perf_counter()
+        manager.update_library(library)
+        result.update(seconds=time.perf_counter() - start, titles=len(manager.files))
+    elif stage == 'load_data':
+        manager = file_manager(data_dir)
+        start = time.perf_counter()
+        manager.load_data()
+        result.update(seconds=time.perf_counter() - start, titles=len(manager.files))
+    elif stage == 'first_page':
+        start = time.perf_counter()
+        manager = file_manager(data_dir)
+        manager.load_first_page(PAGE_ROWS)
+        result.update(seconds=time.perf_counter() - start, rows=len(manager.files))
+    elif stage == 'search':
+        manager = file_manager(data_dir)
+        manager.load_data()
+        manager.update_choices()
+        start = time.perf_counter()
+        manager.search_index.ensure_built()
+        result['build_seconds'] = time.perf_counter() - start
+        samples = []
+        for query in QUERIES:
+            for i in range(1, len(query) + 1):
+                start = time.perf_counter()
+                manager.search_index.search(query[:i], 100)
+                samples.append(time.perf_counter() - start)
+        result.update(seconds=sum(samples), keystrokes=len(samples), **percentiles(samples))
+    elif stage == 'paging':
+        from virtual_list import VirtualList
+        manager = file_manager(data_dir)
+        manager.load_data()
+        files = manager.files
+
+        def row(key):
+            game = files.get(key) or {}
+            return game.get('name') or '', (game.get('id') or '', game.get('region') or '')
+
+        view = VirtualList(StubTreeview(PAGE_ROWS), StubScrollbar(), row)
+        view.set_keys(manager.ordered_keys)
+        samples = []
+        pages = min(MAX_PAGES, max(1, len(manager.ordered_keys) // PAGE_ROWS))
+        for _ in range(pages):
+            start = time.perf_counter()
+            view.scroll(PAGE_ROWS)
+            samples.append(time.perf_counter() - start)
+        result.update(seconds=sum(samples), pages=len(samples), **percentiles(samples))
+    rss_after = peak_rss_mb()
+    if rss_after is not None:
+        result['peak_rss_mb'] = round(rss_after, 1)
+        result['rss_growth_mb'] = round(rss_after - rss_before, 1)
+    for key in ('seconds', 'build_seconds'):
+        if key in result:
+            result[key] = round(result[key], 4)
+    return result
+
+
+def _stage_process(stage, data_dir, library, results):
+    try:
+        results.put((stage, run_stage(stage, data_dir, library)))
+    except Exception as e:
+        results.put((stage, {'error': repr(e)}))
+
+
+def run_size(files, workdir, stages, repeat):
+    library = os.path.join(workdir, 'library')
+    data_dir = os.path.join(workdir, 'data')
+    context = multiprocessing.get_context('spawn')
+    # Generated in a child too: Linux carries the peak RSS of a parent over
+    # into the processes it starts, so the parent has to stay small.
+    start = time.perf_counter()
+    process = context.Process(target=synthetic.generate, args=(library, os.path.join(data_dir, 'titledb', 'titles.json'), files))
+    process.start()
+    process.join()
+    print(f"{files} files generated in {time.perf_counter() - start:.1f}s")
+
+    results = {}
+    for stage in stages:
+        # Best of `repeat` runs, each in a fresh process.
+        runs = []
+        for _ in range(repeat):
+            queue = context.Queue()
+            process = context.Process(target=_stage_process, args=(stage, data_dir, library, queue))
+            process.start()
+            runs.append(queue.get()[1])
+            process.join()
+        result = min(runs, key=lambda r: r.get('seconds', float('inf')))
+        results[stage] = result
+        print(f"  {stage:<13} " + '  '.join(f"{k}={v}" for k, v in result.items()))
+    return results
+
+
+def check(report, baseline, tolerance, thresholds):
+    failures = []
+    for size, stages in report['results'].items():
+        for stage, result in stages.items():
+            if 'error' in result:
+                failures.append(f"{size} {stage}: {result['error']}")
+                continue
+            budget = thresholds.get(size, {}).get(stage, {})
+            for metric, limit in budget.items():
+                if metric in result and result[metric] > limit:
+                    failures.append(f"{size} {stage} {metric} {result[metric]} over budget {limit}")
+            before = baseline.get(size, {}).get(stage, {}) if baseline else {}
+            for metric, floor in NOISE_FLOOR.items():
+                old, new = before.get(metric), result.get(metric)
+                if old and new and new > old * (1 + tolerance) and new - old > floor:
+                    failures.append(f"{size} {stage} {metric} {old} -> {new} (+{(new / old - 1) * 100:.0f}%)")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help='library sizes in files, 1k to 200k')
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=list(STAGES))
+    parser.add_argument('--repeat', type=int, default=3, help='runs per stage, the fastest is kept')
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--baseline', help='earlier results to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown against the baseline')
+    parser.add_argument('--thresholds', default=THRESHOLDS_PATH, help='absolute budgets per size and stage')
+    args = parser.parse_args()
+
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'results': {},
+    }
+    for files in args.sizes:
+        workdir = tempfile.mkdtemp(prefix='emurom-bench-')
+        try:
+            report['results'][str(files)] = run_size(files, workdir, args.stages, args.repeat)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(args.output, 'w') as file:
+        json.dump(report, file, indent=2)
+    print(f"Results written to {args.output}")
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r') as file:
+            baseline = json.load(file)['results']
+    thresholds = {}
+    if args.thresholds and os.path.exists(args.thresholds):
+        with open(args.thresholds, 'r') as file:
+            thresholds = json.load(file)
+    failures = check(report, baseline, args.tolerance, thresholds)
+    for failure in failures:
+        print(f"REGRESSION {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
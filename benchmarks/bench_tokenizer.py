@@ -0,0 +1,85 @@
+import os
+import re
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from filename_parser import _parse, parse_name
+
+# File name parsing: the old NSZ_PATTERN regex against the bracket tokenizer,
+# over synthetic library names and over adversarial names with many bracket
+# groups, which is where the regex backtracks.
+
+LEGACY_PATTERN = re.compile(r"(?P<name>.*)\[(?:(?P<titleid>[A-Za-z0-9]{16}).*|\[(?P<region>[A-Z]{2})\].*|\[v(?P<version>\d{1,})\].*){2}(?:\.nsz|\.nsp)")
+
+WORDS = ("monster hunter rise super mario bros wonder zelda legend tears kingdom "
+         "pokemon scarlet violet kirby layered armor piece sleeves mask pack").split()
+REGIONS = ('US', 'EU', 'JP', 'KR')
+
+
+def make_names(count, rng):
+    names = []
+    for i in range(count):
+        name = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(2, 6))).title()
+        titleid = f"0100{i % 0x1000000:09X}{rng.choice(('000', '800', '001'))}"
+        tags = [f"[{titleid}]", f"[v{rng.randint(0, 9) * 65536}]"]
+        if rng.random() < 0.7:
+            tags.insert(1, f"[{rng.choice(REGIONS)}]")
+        if rng.random() < 0.2:
+            tags.append(f"[DLC {rng.randint(1, 300)}]")
+        names.append(f"{name}{'' if rng.random() < 0.5 else ' '}{''.join(tags)}{rng.choice(('.nsz', '.nsp'))}")
+    return names
+
+
+def make_adversarial(count, groups):
+    # Long names full of bracket groups with no title ID, so the regex has to
+    # try every way of splitting them before giving up.
+    names = []
+    for i in range(count):
+        noise = ''.join(f"[DLC {j}][{'[' * (j % 3)}v{j}" for j in range(groups))
+        names.append(f"Adversarial {i} {noise}[US].nsz")
+    return names
+
+
+def measure(label, fn, names, baseline=None):
+    start = time.perf_counter()
+    matched = sum(1 for name in names if fn(name))
+    elapsed = time.perf_counter() - start
+    speedup = f"  {baseline / elapsed:5.1f}x" if baseline else ''
+    print(f"  {label:<10} {elapsed:8.3f}s  {len(names) / elapsed / 1e6:6.2f}M names/s  {matched} matched{speedup}")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--names', type=int, default=1000000)
+    parser.add_argument('--adversarial', type=int, default=200)
+    parser.add_argument('--groups', type=int, default=40, help='bracket groups per adversarial name')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    names = make_names(args.names, rng)
+    adversarial = make_adversarial(args.adversarial, args.groups)
+
+    print(f"{len(names)} synthetic names, one parse")
+    baseline = measure('legacy', LEGACY_PATTERN.search, names)
+    measure('tokenizer', _parse, names, baseline)
+
+    # What a scan costs per file: the old code ran the regex in the scan and
+    # again when adding the file, now the second call is a cache hit.
+    print(f"{len(names)} synthetic names, scan + add")
+    baseline = measure('legacy', lambda name: LEGACY_PATTERN.search(name) and LEGACY_PATTERN.search(name), names)
+    parse_name.cache_clear()
+    measure('memoized', lambda name: parse_name(name) and parse_name(name), names, baseline)
+    parse_name.cache_clear()
+
+    print(f"{len(adversarial)} adversarial names, {args.groups} bracket groups each")
+    baseline = measure('legacy', LEGACY_PATTERN.search, adversarial)
+    measure('tokenizer', _parse, adversarial, baseline)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from walker import list_matching, walk_parallel
+
+# Compares the original single threaded stack walk with walk_parallel on a
+# synthetic tree, with a fixed delay added to every os.scandir call to stand
+# in for the round trip to a NAS.
+
+
+def legacy_scan_files(directory, match):
+    scanned_files = []
+    stack = [directory]
+    while stack:
+        current_dir = stack.pop()
+        with os.scandir(current_dir) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False) and match(entry.name):
+                    scanned_files.append(entry.path)
+    return scanned_files
+
+
+def build_tree(root, depth, fanout, files_per_dir):
+    count = 0
+    dirs = [root]
+    for _ in range(depth):
+        next_dirs = []
+        for parent in dirs:
+            for i in range(fanout):
+                path = os.path.join(parent, f"d{i}")
+                os.mkdir(path)
+                next_dirs.append(path)
+        dirs = next_dirs
+    for directory in dirs:
+        for i in range(files_per_dir):
+            titleid = f"0100{count:09X}000"
+            open(os.path.join(directory, f"Game {count}[{titleid}][US][v0].nsz"), 'w').close()
+            count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--depth', type=int, default=4)
+    parser.add_argument('--fanout', type=int, default=4)
+    parser.add_argument('--files', type=int, default=5, help='files per leaf directory')
+    parser.add_argument('--latency', type=float, default=0.01, help='seconds added to every scandir call')
+    parser.add_argument('--workers', type=int, nargs='+', default=[4, 16, 32])
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix='emurom-walk-')
+    real_scandir = os.scandir
+
+    def slow_scandir(path):
+        time.sleep(args.latency)
+        return real_scandir(path)
+
+    try:
+        total = build_tree(root, args.depth, args.fanout, args.files)
+        match = lambda name: name.endswith(('.nsp', '.nsz', '.xci', '.xcz'))
+        print(f"{total} files, {args.fanout ** args.depth} leaf directories, {args.latency * 1000:.0f} ms per scandir")
+        os.scandir = slow_scandir
+
+        start = time.perf_counter()
+        found = len(legacy_scan_files(root, match))
+        baseline = time.perf_counter() - start
+        print(f"legacy      {baseline:8.3f}s  {found} files")
+
+        for workers in args.workers:
+            start = time.perf_counter()
+            found = sum(1 for _ in walk_parallel([root], lambda path: list_matching(path, match), workers))
+            elapsed = time.perf_counter() - start
+            print(f"workers={workers:<3} {elapsed:8.3f}s  {found} files  {baseline / elapsed:5.1f}x")
+    finally:
+        os.scandir = real_scandir
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+import os
+import json
+import random
+import argparse
+
+# Synthetic libraries for the benchmarks.  File names follow the README
+# conventions (base xxx000, update xxx800, DLC numbered after the base with
+# the odd [DLC n] tag), split across base/update/dlc folders with at most
+# `per_dir` files per folder.  Files are empty; only names and directory
+# structure matter to the code being measured.  The matching titles.json has
+# an entry for every base title plus as many unrelated ones, with the bulky
+# fields the real one carries.
+
+WORDS = ("monster hunter rise super mario bros wonder zelda legend tears kingdom "
+         "pokemon scarlet violet kirby forgotten land metroid dread animal crossing "
+         "new horizons splatoon fire emblem engage xenoblade chronicles octopath "
+         "traveler bayonetta hollow knight celeste hades dead cells stardew valley").split()
+DLC_WORDS = "layered armor piece sleeves mask pack costume set bonus quest".split()
+REGIONS = ('US', 'EU', 'JP', 'KR')
+
+
+def title_name(rng):
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(2, 5))).title()
+
+
+def make_titles(count, rng):
+    # [(title id of the base, name, region, [file names])]
+    titles = []
+    files = 0
+    index = 0
+    while files < count:
+        base_id = f"0100{index:09X}000"
+        name = title_name(rng)
+        region = rng.choice(REGIONS)
+        names = [('base', f"{name}[{base_id}][{region}][v0].nsz")]
+        for version in range(1, rng.choice((0, 1, 1, 2)) + 1):
+            names.append(('update', f"{name}[{base_id[:-3]}800][{region}][v{version * 65536}].nsz"))
+        for dlc in range(1, rng.choice((0, 0, 1, 3, 6)) + 1):
+            dlc_id = f"{int(base_id, 16) + 0x1000 + dlc:016X}"
+            if rng.random() < 0.3:
+                names.append(('dlc', f"{name.upper()} [{dlc_id}][v0][DLC {dlc}].nsz"))
+            else:
+                names.append(('dlc', f"{rng.choice(DLC_WORDS).title()} {rng.choice(DLC_WORDS)}[{dlc_id}][{region}][v0].nsz"))
+        names = names[:count - files]
+        titles.append((base_id, name, region, names))
+        files += len(names)
+        index += 1
+    return titles
+
+
+def write_library(root, titles, per_dir=500):
+    counters = {}
+    for _, _, _, names in titles:
+        for file_type, name in names:
+            n = counters.get(file_type, 0)
+            counters[file_type] = n + 1
+            directory = os.path.join(root, file_type, f"{n // per_dir:04d}")
+            if n % per_dir == 0:
+                os.makedirs(directory, exist_ok=True)
+            open(os.path.join(directory, name), 'w').close()
+
+
+def write_titles_json(path, titles, rng):
+    data = {}
+    nsuid = 70010000000000
+
+    def entry(title_id, name, region):
+        return {
+            'id': title_id,
+            'name': name,
+            'region': region,
+            'rank': rng.randint(1, 50000),
+            'size': rng.randint(1, 16) << 30,
+            'iconUrl': f"https://example.invalid/icons/{title_id}.jpg",
+            'bannerUrl': f"https://example.invalid/banners/{title_id}.jpg",
+            'screenshots': [f"https://example.invalid/shots/{title_id}/{i}.jpg" for i in range(6)],
+            'intro': f"{name} intro text. " * 3,
+            'description': f"{name} long description. " * 40,
+            'publisher': 'Synthetic Publisher',
+            'developer': 'Synthetic Developer',
+            'releaseDate': 20200101,
+            'languages': ['en', 'ja', 'fr', 'de'],
+            'category': ['Action', 'Adventure'],
+            'numberOfPlayers': 4,
+            'ratingContent': ['Fantasy Violence'],
+            'isDemo': False,
+        }
+
+    for title_id, name, region, _ in titles:
+        data[str(nsuid)] = entry(title_id, name, region)
+        nsuid += 1
+    # Titles the library does not have.
+    for i in range(len(titles)):
+        data[str(nsuid)] = entry(f"0500{i:09X}000", title_name(rng), rng.choice(REGIONS))
+        nsuid += 1
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as file:
+        json.dump(data, file)
+
+
+def generate(root, titles_path, count, seed=1):
+    rng = random.Random(seed)
+    titles = make_titles(count, rng)
+    write_library(root, titles)
+    write_titles_json(titles_path, titles, rng)
+    return titles
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic library and titles.json")
+    parser.add_argument('root', help='library folder to create')
+    parser.add_argument('--files', type=int, default=10000)
+    parser.add_argument('--titles-json', help='defaults to <root>/titles.json')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    titles = generate(args.root, args.titles_json or os.path.join(args.root, 'titles.json'), args.files, args.seed)
+    print(f"{args.files} files, {len(titles)} titles in {args.root}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from typing import Dict, List, Optional
+
+from filename_parser import parse_path
+
+# Record of what has been built into an output folder.  Each title key maps to
+# a fingerprint of the input set it was built from (path, size, mtime and
+# version of every file) and the size and mtime of the XCIs that came out.  A
+# build whose inputs fingerprint the same and whose XCIs are still there
+# untouched does not need to run again; a new update, a replaced file or a
+# deleted or modified XCI all make it miss.
+
+MANIFEST_NAME = '.emurom-builds.json'
+
+_locks: Dict[str, threading.Lock] = {}
+_locks_lock = threading.Lock()
+
+
+def _stat(path: str) -> Optional[list]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+
+def fingerprint(files: List[str], versions: Optional[Dict[str, int]] = None) -> str:
+    versions = versions or {}
+    digest = hashlib.sha1()
+    for path in sorted(files):
+        rom = parse_path(path)
+        version = versions.get(path, rom.version if rom else None)
+        digest.update(json.dumps([path, _stat(path), version]).encode())
+    return digest.hexdigest()
+
+
+class BuildManifest:
+    def __init__(self, output_dir: str) -> None:
+        self.path = os.path.join(output_dir, MANIFEST_NAME)
+        with _locks_lock:
+            # Shared by every job writing to the same folder.
+            self.lock = _locks.setdefault(os.path.abspath(self.path), threading.Lock())
+
+    def _load(self) -> Dict[str, Dict]:
+        try:
+            with open(self.path, 'r') as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {}
+        except (json.JSONDecodeError, IOError) as e:
+            print(f"Ignoring unreadable build manifest {self.path}: {e}")
+            return {}
+
+    # The XCIs built for `key` from inputs with this fingerprint, or None if
+    # there are none or any of them has changed since.
+    def lookup(self, key: str, inputs: str) -> Optional[List[str]]:
+        with self.lock:
+            entry = self._load().get(key)
+        if not entry or entry.get('inputs') != inputs or not entry.get('artifacts'):
+            return None
+        for path, stat in entry['artifacts']:
+            if _stat(path) != stat:
+                return None
+        return [path for path, _ in entry['artifacts']]
+
+    def record(self, key: str, inputs: str, artifacts: List[str]) -> None:
+        with self.lock:
+            builds = self._load()
+            builds[key] = {
+                'inputs': inputs,
+                'artifacts': [[path, _stat(path)] for path in artifacts],
+                'built': time.time(),
+            }
+            tmp_path = self.path + '.tmp'
+            try:
+                with open(tmp_path, 'w') as file:
+                    json.dump(builds, file)
+                os.replace(tmp_path, self.path)
+            except IOError as e:
+                print(f"Error saving build manifest: {e}")
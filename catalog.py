@@ -0,0 +1,221 @@
+import os
+import sys
+import json
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# The library catalog: one row per title key, kept in SQLite so a rescan only
+# writes the titles that changed and the UI can read the first screenful in
+# rank order without loading everything.  Each save is a single transaction,
+# so a crash leaves either the old or the new catalog, never half of one.
+#
+# Titles are held in memory as CatalogRecords: slots instead of a dict per
+# title, only the fields the UI reads, and the intro text left in the catalog
+# until a title is actually shown.
+
+FIELDS = ('id', 'name', 'region', 'rank', 'size', 'intro', 'iconUrl')
+FILE_TYPES = ('base', 'update', 'dlc')
+# Stored as JSON; `versions` maps each file path to the version in its name.
+JSON_FIELDS = {'base': list, 'update': list, 'dlc': list, 'versions': dict}
+RECORD_FIELDS = frozenset(FIELDS + tuple(JSON_FIELDS))
+# Read for every title; the intro only through Catalog.intro().
+LOADED_FIELDS = tuple(field for field in FIELDS if field != 'intro')
+UNRANKED = 999999
+ORDER = f"COALESCE(rank, {UNRANKED}), name, key"
+SELECT_CHUNK = 2000
+
+
+def sort_key(key: str, game: Dict) -> tuple:
+    # Same order as ORDER above.  SQLite sorts NULL names first, so does ''.
+    return (game.get('rank') or UNRANKED, game.get('name') or '', key)
+
+
+# Marks an intro that is in the catalog but not in memory.
+_UNLOADED = object()
+
+
+class CatalogRecord:
+    __slots__ = ('key', 'id', 'name', 'region', 'rank', 'size', 'iconUrl', 'base', 'update', 'dlc', 'versions',
+                 '_intro', 'catalog')
+
+    def __init__(self, key: str, catalog: Optional['Catalog'] = None, **fields) -> None:
+        self.key = key
+        self.catalog = catalog
+        self.id = self.name = self.region = self.rank = self.size = self.iconUrl = None
+        self.base: List[str] = []
+        self.update: List[str] = []
+        self.dlc: List[str] = []
+        self.versions: Dict[str, int] = {}
+        self._intro = _UNLOADED if catalog is not None and 'intro' not in fields else None
+        self.merge(fields)
+
+    # Straight from a catalog row (key, LOADED_FIELDS, JSON_FIELDS), without
+    # the keyword handling, since a whole library is read this way.
+    @classmethod
+    def from_row(cls, row: tuple, catalog: 'Catalog') -> 'CatalogRecord':
+        record = cls.__new__(cls)
+        record.key, record.id, record.name, region, record.rank, record.size, record.iconUrl = row[:7]
+        record.region = sys.intern(region) if region else region
+        record.catalog = catalog
+        record._intro = _UNLOADED
+        base, update, dlc, versions = row[7:]
+        record.base = json.loads(base) if base else []
+        record.update = json.loads(update) if update else []
+        record.dlc = json.loads(dlc) if dlc else []
+        record.versions = {}
+        if versions:
+            # Keyed by the path strings already in the lists rather than a
+            # second copy of every path.
+            versions = json.loads(versions)
+            for files in (record.base, record.update, record.dlc):
+                for path in files:
+                    if path in versions:
+                        record.versions[path] = versions[path]
+        return record
+
+    @property
+    def intro(self) -> Optional[str]:
+        if self._intro is _UNLOADED:
+            return self.catalog.intro(self.key)
+        return self._intro
+
+    @intro.setter
+    def intro(self, value: Optional[str]) -> None:
+        self._intro = value
+
+    # The intro if it is held in memory (not yet saved), None otherwise.
+    def pending_intro(self) -> Optional[str]:
+        return None if self._intro is _UNLOADED else self._intro
+
+    # Once saved the intro is read back from the catalog when needed.
+    def saved(self, catalog: 'Catalog') -> None:
+        self.catalog = catalog
+        self._intro = _UNLOADED
+
+    # Fields the record does not keep (the rest of a titles DB entry) are
+    # dropped.
+    def merge(self, fields: Dict) -> None:
+        for field, value in fields.items():
+            if field in RECORD_FIELDS:
+                if field == 'region' and value:
+                    value = sys.intern(value)
+                setattr(self, field, value)
+
+    # Read like the dicts titles used to be, `game['name']`, `game.get(...)`.
+    def __getitem__(self, field: str):
+        if field not in RECORD_FIELDS:
+            raise KeyError(field)
+        return getattr(self, field)
+
+    def get(self, field: str, default=None):
+        return getattr(self, field) if field in RECORD_FIELDS else default
+
+    def __contains__(self, field: str) -> bool:
+        return field in RECORD_FIELDS
+
+
+class Catalog:
+    VERSION = 2
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=FULL")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS titles (key TEXT PRIMARY KEY, "
+                              + ', '.join(f'"{field}"' for field in FIELDS + tuple(JSON_FIELDS)) + ")")
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS titles_order ON titles ({ORDER})")
+            # Version 1 catalogs have no versions column, rows without one
+            # fall back to parsing the file names.
+            columns = {row[1] for row in self.conn.execute("PRAGMA table_info(titles)")}
+            if 'versions' not in columns:
+                self.conn.execute("ALTER TABLE titles ADD COLUMN versions")
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)", (str(self.VERSION),))
+
+    @staticmethod
+    def _row(game) -> tuple:
+        # A record whose intro was never loaded writes NULL, which save()
+        # does not let overwrite the stored one.
+        intro = game.pending_intro() if isinstance(game, CatalogRecord) else game.get('intro')
+        return (tuple(intro if field == 'intro' else game.get(field) for field in FIELDS)
+                + tuple(json.dumps(game.get(field) or empty()) for field, empty in JSON_FIELDS.items()))
+
+    def _select(self, where: str = '', params: tuple = ()) -> List[Tuple[str, CatalogRecord]]:
+        columns = ', '.join(f'"{column}"' for column in ('key',) + LOADED_FIELDS + tuple(JSON_FIELDS))
+        # Built a chunk at a time, so the raw rows of a whole library are never
+        # held at once and intro() is not kept waiting for the whole read.
+        games = []
+        with self.lock:
+            cursor = self.conn.execute(f"SELECT {columns} FROM titles {where}", params)
+        while True:
+            with self.lock:
+                rows = cursor.fetchmany(SELECT_CHUNK)
+            if not rows:
+                return games
+            games.extend((row[0], CatalogRecord.from_row(row, self)) for row in rows)
+
+    def meta(self, key: str) -> Optional[str]:
+        with self.lock:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: Optional[str]) -> None:
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def count(self) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM titles").fetchone()[0]
+
+    def page(self, offset: int, limit: int) -> List[Tuple[str, Dict]]:
+        return self._select(f"ORDER BY {ORDER} LIMIT ? OFFSET ?", (limit, offset))
+
+    def load(self) -> Dict[str, CatalogRecord]:
+        return dict(self._select(f"ORDER BY {ORDER}"))
+
+    def get(self, key: str) -> Optional[CatalogRecord]:
+        rows = self._select("WHERE key = ?", (key,))
+        return rows[0][1] if rows else None
+
+    def intro(self, key: str) -> Optional[str]:
+        with self.lock:
+            row = self.conn.execute("SELECT intro FROM titles WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    # Writes the given titles and deletes `removed` in one transaction.  With
+    # `replace` everything not in `games` is dropped as well.
+    def save(self, games: Dict, removed: Iterable[str] = (), replace: bool = False) -> None:
+        placeholders = ', '.join('?' * (1 + len(FIELDS) + len(JSON_FIELDS)))
+        updates = ', '.join(f'"{column}" = excluded."{column}"' for column in FIELDS + tuple(JSON_FIELDS)
+                            if column != 'intro')
+        with self.lock, self.conn:
+            if replace:
+                self.conn.execute("DELETE FROM titles")
+            self.conn.executemany("DELETE FROM titles WHERE key = ?", [(key,) for key in removed])
+            self.conn.executemany(f"INSERT INTO titles VALUES ({placeholders}) ON CONFLICT (key) DO UPDATE SET "
+                                  f"{updates}, intro = COALESCE(excluded.intro, intro)",
+                                  [(key,) + self._row(game) for key, game in games.items()])
+
+    # One-time import of the result.json written by older versions.  The old
+    # file is renamed rather than deleted so a downgrade can still find it.
+    def migrate_json(self, json_path: str) -> bool:
+        if not os.path.exists(json_path) or self.count():
+            return False
+        try:
+            with open(json_path, 'r') as file:
+                files = json.load(file)
+        except (json.JSONDecodeError, IOError) as e:
+            print(f"Error migrating {json_path}: {e}")
+            return False
+        self.save(files, replace=True)
+        os.replace(json_path, json_path + '.migrated')
+        print(f"Migrated {len(files)} titles from {json_path}")
+        return True
+
+    def close(self) -> None:
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,176 @@
+import os
+import sys
+import json
+import time
+import argparse
+
+import perf
+from file_manager import FileManager
+
+# Headless front end for scripted use, e.g.
+#
+#   python cli.py scan /mnt/switch_roms
+#   python cli.py search "monster hunter" --json
+#   python cli.py build 0100B04011742 --output /mnt/roms/switch --jobs 2
+#
+# Only the library model is imported up front; the ACORN build machinery is
+# loaded when a build is actually requested.
+
+
+def emit(args, data, text_lines) -> None:
+    if args.json:
+        json.dump(data, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+    else:
+        for line in text_lines:
+            print(line)
+
+
+def game_row(key: str, game: dict) -> dict:
+    return {
+        'key': key,
+        'id': game.get('id'),
+        'name': game.get('name'),
+        'region': game.get('region'),
+        'base': len(game['base']),
+        'update': len(game['update']),
+        'dlc': len(game['dlc']),
+    }
+
+
+def format_row(row: dict) -> str:
+    return f"{row['key']}\t{row['id']}\t{row['region'] or '--'}\t{row['base']}/{row['update']}/{row['dlc']}\t{row['name']}"
+
+
+def cmd_scan(file_manager: FileManager, args) -> int:
+    if args.workers:
+        file_manager.scan_workers = args.workers
+    file_manager.load_data()
+    summary = file_manager.update_library(os.path.abspath(args.directory))
+    emit(args, {'titles': len(file_manager.files), **file_manager.scan_index.stats},
+         [summary.rstrip(), f"{len(file_manager.files)} titles"])
+    return 0
+
+
+def cmd_list(file_manager: FileManager, args) -> int:
+    file_manager.load_data()
+    keys = file_manager.ordered_keys[:args.limit] if args.limit else file_manager.ordered_keys
+    rows = [game_row(key, file_manager.files[key]) for key in keys]
+    emit(args, rows, [format_row(row) for row in rows])
+    return 0
+
+
+def cmd_search(file_manager: FileManager, args) -> int:
+    file_manager.load_data()
+    file_manager.update_choices()
+    keys = file_manager.search_index.search(args.query, args.limit)
+    rows = [game_row(key, file_manager.files[key]) for key in keys if key in file_manager.files]
+    emit(args, rows, [format_row(row) for row in rows])
+    return 0
+
+
+def cmd_build(file_manager: FileManager, args) -> int:
+    from selection import select_files
+    from staging import InputStager
+    from transfer_queue import DONE, TransferJob, TransferQueue, build_job, prefetch_job
+
+    file_manager.load_data()
+    keys = file_manager.ordered_keys if args.all else args.keys
+    unknown = [key for key in keys if key not in file_manager.files]
+    if unknown:
+        print(f"Unknown title keys: {', '.join(unknown)}", file=sys.stderr)
+        return 2
+    if not keys:
+        print("Nothing to build, pass title keys or --all", file=sys.stderr)
+        return 2
+
+    output_dir = args.output
+    if not output_dir:
+        sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ACORN'))
+        from acorn import get_default_output_dir
+        output_dir = get_default_output_dir()
+
+    stager = InputStager()
+    log = (lambda msg: None) if args.quiet else sys.stderr.write
+
+    def runner(job: TransferJob) -> None:
+        build_job(job, stager, on_message=log, force=args.force)
+
+    transfer_queue = TransferQueue(runner, max_concurrency=args.jobs, per_volume_limit=args.per_volume)
+    selections = {}
+    for key in keys:
+        game = file_manager.files[key]
+        name = game['name'] or key
+        selections[key] = selection = select_files(game)
+        if selection.dropped and not args.quiet:
+            sys.stderr.write(selection.describe(name))
+        job = TransferJob(key, name, selection.files, output_dir, game.get('versions'))
+        prefetch_job(job, stager, force=args.force)
+        transfer_queue.add(job)
+
+    try:
+        while transfer_queue.active():
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        transfer_queue.cancel_all()
+        while transfer_queue.active():
+            time.sleep(0.1)
+    finally:
+        stager.cleanup()
+
+    rows = [{
+        'key': job.key,
+        'name': job.name,
+        'status': job.status,
+        'outputs': job.outputs,
+        'skipped': [path for path, _ in selections[job.key].dropped],
+        'bytes_saved': selections[job.key].bytes_saved,
+        'seconds': round(job.elapsed(), 1),
+        'bytes_per_second': round(job.throughput()),
+    } for job in transfer_queue.jobs]
+    emit(args, rows, [f"{row['status']}\t{row['seconds']}s\t{row['key']}\t{row['name']}" for row in rows])
+    return 0 if all(job.status == DONE for job in transfer_queue.jobs) else 1
+
+
+def build_parser() -> argparse.ArgumentParser:
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--json', action='store_true', help="machine readable output")
+    common.add_argument('--perf-log', help="append timing spans as JSON lines to this file")
+    parser = argparse.ArgumentParser(prog='emurommanager', description="Headless EmuRomManager")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    scan = commands.add_parser('scan', parents=[common], help="scan an input folder and update the library")
+    scan.add_argument('directory')
+    scan.add_argument('--workers', type=int, help="concurrent directory listings")
+    scan.set_defaults(func=cmd_scan)
+
+    list_ = commands.add_parser('list', parents=[common], help="list the library")
+    list_.add_argument('--limit', type=int)
+    list_.set_defaults(func=cmd_list)
+
+    search = commands.add_parser('search', parents=[common], help="fuzzy search the library")
+    search.add_argument('query')
+    search.add_argument('--limit', type=int, default=20)
+    search.set_defaults(func=cmd_search)
+
+    build = commands.add_parser('build', parents=[common], help="build XCIs for title keys (13 character title ID prefix)")
+    build.add_argument('keys', nargs='*')
+    build.add_argument('--all', action='store_true', help="build the whole library")
+    build.add_argument('--output', help="output folder, defaults to ACORN's")
+    build.add_argument('--jobs', type=int, default=2, help="builds to run at once")
+    build.add_argument('--per-volume', type=int, default=1, help="builds allowed to share a source or output volume")
+    build.add_argument('--force', action='store_true', help="rebuild even if the output is up to date")
+    build.add_argument('--quiet', action='store_true', help="hide ACORN output")
+    build.set_defaults(func=cmd_build)
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.perf_log:
+        perf.enable(args.perf_log)
+    return args.func(FileManager(), args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
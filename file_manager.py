@@ -0,0 +1,320 @@
+import os
+import time
+import threading
+from typing import Dict, Optional
+
+import perf
+from catalog import Catalog, CatalogRecord, sort_key
+from filename_parser import parse_name, parse_path
+from paths import script_dir
+from scan_index import ScanIndex
+from search_index import SearchIndex
+from titles_db import TitlesIndex, fetch_titles_db, titles_db_age
+from walker import DEFAULT_WORKERS, list_matching, walk_parallel
+from watcher import LibraryWatcher
+
+# Library model shared by the GUI and the CLI.  Nothing in here imports
+# tkinter or requests at module level so headless use stays fast to start.
+
+class FileManager:
+    def __init__(self, game_manager=None, image_manager=None, data_dir: Optional[str] = None) -> None:
+        # Where the catalog, scan index and titles DB live, the script
+        # folder unless told otherwise (benchmarks use a scratch folder).
+        data_dir = data_dir or script_dir
+        self.files: Dict[str, CatalogRecord] = {}
+        # The search texts ("<name> <title id>") live only in the index.
+        self.search_index = SearchIndex()
+        self.titles_db_path = os.path.join(data_dir, "titledb", "titles.json")
+        self.titles_db_url = "https://tinfoil.media/repo/db/titles.json"
+        os.makedirs(os.path.dirname(self.titles_db_path), exist_ok=True)
+        self.titles_index = TitlesIndex(self.titles_db_path, os.path.join(data_dir, "titledb", "titles.sqlite"))
+        self.titles_db_max_age = 7 * 24 * 60 * 60
+        self.titles_db_refresh_lock = threading.Lock()
+        self._session = None
+        self.ordered_keys: list = []
+        self.game_manager = game_manager
+        self.image_manager = image_manager
+        self.scan_index = ScanIndex(os.path.join(data_dir, "scan_index.json"))
+        self.scan_workers = DEFAULT_WORKERS
+        self.catalog = Catalog(os.path.join(data_dir, "catalog.sqlite"))
+        self.legacy_data_path = os.path.join(data_dir, "result.json")
+        # Keys added, changed or removed since the last save, and whether the
+        # catalog has to be replaced wholesale (new input folder).
+        self.changed_keys: set = set()
+        self.replace_catalog = False
+        # Titles index version merged into the library, saved with it.
+        self.titles_version: Optional[str] = None
+        self.loaded = threading.Event()
+        self.loaded.set()
+        # Held for a whole scan so a manual refresh and the watcher never
+        # apply deltas at the same time.
+        self.library_lock = threading.Lock()
+        self.watcher: Optional[LibraryWatcher] = None
+
+    def load_data(self) -> bool:
+        self.catalog.migrate_json(self.legacy_data_path)
+        with perf.span('library.load'):
+            self.files = self.catalog.load()
+        self.ordered_keys = list(self.files)
+        return bool(self.files)
+
+    # Just the first `limit` rows in display order, enough to fill the list
+    # while load_data_background reads the rest.
+    def load_first_page(self, limit: int) -> bool:
+        self.catalog.migrate_json(self.legacy_data_path)
+        self.files = dict(self.catalog.page(0, limit))
+        self.ordered_keys = list(self.files)
+        return bool(self.files)
+
+    def load_data_background(self, on_loaded=None) -> None:
+        self.loaded.clear()
+
+        def load():
+            try:
+                self.load_data()
+                self.update_choices()
+            except Exception as e:
+                print(f"Error loading data: {e}")
+            finally:
+                self.loaded.set()
+            if on_loaded:
+                on_loaded()
+
+        threading.Thread(target=load, daemon=True).start()
+
+    def save_data(self) -> None:
+        saved = {key: self.files[key] for key in self.changed_keys if key in self.files}
+        self.catalog.save(saved, removed=[key for key in self.changed_keys if key not in self.files],
+                          replace=self.replace_catalog)
+        for game in saved.values():
+            game.saved(self.catalog)
+        self.changed_keys.clear()
+        self.replace_catalog = False
+        if self.titles_version:
+            self.catalog.set_meta('titles_version', self.titles_version)
+            self.titles_version = None
+        # Saved after the catalog so the index never runs ahead of the data it
+        # describes.
+        self.scan_index.save()
+
+    def update_choices(self) -> None:
+        self.search_index.rebuild({key: f"{game.name} {game.id}" for key, game in self.files.items()
+                                   if game.id and game.name})
+
+    def set_choice(self, key: str, text: str) -> None:
+        self.search_index.add(key, text)
+
+    def remove_choice(self, key: str) -> None:
+        self.search_index.remove(key)
+
+    def clear_choices(self) -> None:
+        self.search_index.clear()
+
+    def sort_files_by_rank(self) -> None:
+        sorted_keys = sorted(self.files, key=lambda x: sort_key(x, self.files[x]))
+        self.files = {key: self.files[key] for key in sorted_keys}
+        self.ordered_keys = sorted_keys
+
+    def type_check(self, check_digit: str) -> str:
+        type_mapping = {"000": "base", "800": "update"}
+        return type_mapping.get(check_digit, "dlc")
+
+    @property
+    def session(self):
+        if self._session is None:
+            import requests
+            self._session = requests.Session()
+        return self._session
+
+    def download_titles_db(self) -> bool:
+        import requests
+        try:
+            with perf.span('titles.download'):
+                updated = fetch_titles_db(self.session, self.titles_db_url, self.titles_db_path, self.titles_index.lock)
+            if updated:
+                print("Downloaded updated titles.json")
+            return True
+        except (requests.RequestException, IOError) as e:
+            print(f"Failed to download titles.json: {e}")
+            return False
+
+    def refresh_titles_db_background(self) -> None:
+        if self.titles_db_max_age is None or titles_db_age(self.titles_db_path) < self.titles_db_max_age:
+            return
+        if not self.titles_db_refresh_lock.acquire(blocking=False):
+            return
+
+        def refresh():
+            try:
+                self.download_titles_db()
+            finally:
+                self.titles_db_refresh_lock.release()
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    def scan_files(self, directory, match=parse_name):
+        return walk_parallel([directory], lambda path: list_matching(path, match), self.scan_workers)
+
+    def refresh_files_thread(self, directory: str) -> None:
+        thread = threading.Thread(target=self._refresh_files, args=(directory,))
+        thread.start()
+
+    def parse_file(self, filename: str):
+        rom = parse_path(filename)
+        if not rom:
+            return None, None, None
+        titleid = rom.title_id
+        file_type = self.type_check(titleid[-3:])
+        key = f"{int(titleid, 16)-0x1000:0{16}X}"[:-3] if file_type == 'dlc' else titleid[:-3]
+        return key, file_type, rom
+
+    def add_file(self, filename: str) -> Optional[str]:
+        key, file_type, rom = self.parse_file(filename)
+        if not key:
+            return None
+        titleid = rom.title_id
+        game = self.files.get(key)
+        if game is None:
+            game = self.files[key] = CatalogRecord(key, name=rom.name or None, id=titleid, region=rom.region)
+            self.set_choice(key, f"{rom.name} {titleid}")
+        files = getattr(game, file_type)
+        if filename not in files:
+            files.append(filename)
+            game.versions[filename] = rom.version
+            self.changed_keys.add(key)
+        return key
+
+    def remove_file(self, filename: str) -> None:
+        key, file_type, _ = self.parse_file(filename)
+        game = self.files.get(key)
+        if not game:
+            return
+        files = getattr(game, file_type)
+        if filename in files:
+            files.remove(filename)
+            game.versions.pop(filename, None)
+            self.changed_keys.add(key)
+        if not (game.base or game.update or game.dlc):
+            del self.files[key]
+            self.remove_choice(key)
+
+    # Brings self.files up to date with `directory` and saves it, returns the
+    # scan summary.  No UI involved, shared by the GUI and the CLI.
+    def update_library(self, directory: str) -> str:
+        # A scan started while the catalog is still loading works on top of
+        # the full library, not the first page.
+        self.loaded.wait()
+        with self.library_lock, perf.span('library.update', directory=directory):
+            return self._update_library(directory)
+
+    def _update_library(self, directory: str) -> str:
+        # Only apply deltas on top of what is loaded when the index describes
+        # the same folder, otherwise start over.
+        if self.scan_index.root != directory or not self.files:
+            self.files.clear()
+            self.clear_choices()
+            self.scan_index.reset(directory)
+            self.replace_catalog = True
+
+        if os.path.exists(self.titles_db_path):
+            # Revalidate a stale copy without holding up the scan, the newer
+            # data is merged into every title on the next refresh (see
+            # titles_version below).
+            titles_db_available = True
+            self.refresh_titles_db_background()
+        else:
+            titles_db_available = self.download_titles_db()
+        known_keys = set(self.files)
+
+        # Listing and applying are interleaved, so when timing, the time
+        # spent applying each delta is split back out of the walk.
+        timed = perf.enabled
+        started = time.perf_counter()
+        applying = 0.0
+        for event, filename in self.scan_index.scan(directory, parse_name, self.scan_workers):
+            if timed:
+                t = time.perf_counter()
+            if event == 'removed':
+                self.remove_file(filename)
+            else:
+                self.add_file(filename)
+            if timed:
+                applying += time.perf_counter() - t
+        if timed:
+            stats = self.scan_index.stats
+            perf.record('library.walk', time.perf_counter() - started - applying,
+                        dirs_scanned=stats['dirs_scanned'], dirs_skipped=stats['dirs_skipped'])
+            perf.record('library.parse', applying, files=stats['files_reprocessed'] + stats['files_removed'])
+
+        new_keys = set(self.files) - known_keys
+
+        if titles_db_available and self.files and self.titles_index.ensure():
+            merge_keys = new_keys
+            version = self.titles_index.version()
+            if version != self.catalog.meta('titles_version'):
+                # A titles DB the library has not seen (a refresh finished in
+                # the background since): every title is merged again, so
+                # renamed titles and ones missing before are picked up.
+                merge_keys = set(self.files)
+                self.titles_version = version
+            if merge_keys:
+                with perf.span('library.merge', titles=len(merge_keys)):
+                    for key, title_data in self.titles_index.lookup(merge_keys).items():
+                        game = self.files[key]
+                        if (game.name, game.id) != (title_data['name'], title_data['id']) or key in new_keys:
+                            self.set_choice(key, f"{title_data['name']} {title_data['id']}")
+                        game.merge(title_data)
+                        self.changed_keys.add(key)
+
+        if self.changed_keys or self.replace_catalog or self.titles_version:
+            with perf.span('library.sort', titles=len(self.files)):
+                self.sort_files_by_rank()
+            with perf.span('library.save', titles=len(self.changed_keys)):
+                self.save_data()
+        else:
+            self.scan_index.save()
+        return self.scan_index.summary()
+
+    def _refresh_files(self, directory: str) -> None:
+        self.game_manager.dispatcher.post(self.game_manager.start_busy)
+        try:
+            self.game_manager.update_transfer_ui(text=self.update_library(directory))
+            self.game_manager.dispatcher.post(self.populate_treeview)
+            if self.watcher and self.watcher.root != directory:
+                self.start_watching()
+        except IOError as e:
+            print(f"Error saving data: {e}")
+        finally:
+            self.game_manager.dispatcher.post(self.game_manager.stop_busy)
+
+    def start_watching(self) -> Optional[str]:
+        self.stop_watching()
+        directory = self.scan_index.root
+        if not directory or not os.path.isdir(directory):
+            return None
+        self.watcher = LibraryWatcher(directory, self._apply_watched_changes, self.scan_index.has_changes)
+        self.watcher.start()
+        return directory
+
+    def stop_watching(self) -> None:
+        if self.watcher:
+            self.watcher.stop()
+            self.watcher = None
+
+    # Runs on the watcher thread.  Only the directories that changed are
+    # listed again; the list is patched in place rather than repopulated.
+    def _apply_watched_changes(self) -> None:
+        summary = self.update_library(self.scan_index.root)
+        stats = self.scan_index.stats
+        if stats['files_reprocessed'] or stats['files_removed']:
+            self.game_manager.update_transfer_ui(text=summary)
+            self.game_manager.dispatcher.post(self.game_manager.library_changed)
+
+    def populate_treeview(self) -> None:
+        self.game_manager.virtual_list.set_keys(self.ordered_keys)
+
+    def refresh(self) -> None:
+        from tkinter import filedialog
+        directory = filedialog.askdirectory()
+        if directory:
+            self.refresh_files_thread(directory)
@@ -0,0 +1,60 @@
+import os
+import re
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+# Parses the scene style names the library is built from, e.g.
+#
+#   MONSTER HUNTER RISE [0100B040117430C5][v0][DLC 197].nsz
+#
+# The name is everything before the first bracket group.  After that every
+# [...] group is looked at once: 16 hex digits is the title ID, [vN] the
+# version and two capital letters the region; anything else ([DLC 197],
+# [Update]) is skipped.  A title ID and a version are required, in any order.
+#
+# GROUP matches exactly one bracket group and cannot run past a bracket, so
+# findall walks the name left to right once and never backtracks across
+# groups, however many of them there are.  (A character loop in Python does
+# the same walk about twice as slowly as the regex engine.)
+
+EXTENSIONS = ('.nsp', '.nsz', '.xci', '.xcz')
+CACHE_SIZE = 1 << 18
+GROUP = re.compile(r"\[(?:([0-9A-Fa-f]{16})|v([0-9]+)|([A-Z]{2})|[^\[\]]*)\]")
+
+
+class RomName(NamedTuple):
+    name: str
+    title_id: str
+    region: Optional[str]
+    version: int
+    extension: str
+
+
+def _parse(filename: str) -> Optional[RomName]:
+    dot = filename.rfind('.')
+    extension = filename[dot:].lower()
+    if dot < 0 or extension not in EXTENSIONS:
+        return None
+    start = filename.find('[', 0, dot)
+    if start < 0:
+        return None
+    title_id = region = version = None
+    for group_id, group_version, group_region in GROUP.findall(filename, start, dot):
+        if group_id:
+            title_id = title_id or group_id
+        elif group_version:
+            version = version or group_version
+        elif group_region:
+            region = region or group_region
+    if title_id is None or version is None:
+        return None
+    return RomName(filename[:start].strip(), title_id.upper(), region, int(version), extension)
+
+
+# Keyed by file name: the scan and the library update both look at the same
+# names, so the second pass is a dictionary hit.
+parse_name = lru_cache(maxsize=CACHE_SIZE)(_parse)
+
+
+def parse_path(path: str) -> Optional[RomName]:
+    return parse_name(os.path.basename(path))
@@ -0,0 +1,98 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Iterable, List, Optional
+
+# On-disk icon store.  All thumbnails live as blobs in one SQLite file instead
+# of one PNG per URL, each with a SHA-1 of its bytes so truncated or corrupt
+# entries are caught (and dropped) when they are read rather than when Tk tries
+# to show them.  Total size is capped at `max_bytes`; the least recently read
+# icons are evicted first.
+
+EVICT_BATCH = 64
+
+
+class IconCache:
+    def __init__(self, path: str, max_bytes: int) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS icons (url TEXT PRIMARY KEY, data BLOB NOT NULL, "
+                              "size INTEGER NOT NULL, sha1 TEXT NOT NULL, accessed REAL NOT NULL)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS icons_accessed ON icons (accessed)")
+            self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM icons").fetchone()[0]
+
+    def get(self, url: str) -> Optional[bytes]:
+        with self.lock:
+            row = self.conn.execute("SELECT data, sha1 FROM icons WHERE url = ?", (url,)).fetchone()
+            if row is None:
+                return None
+            data, sha1 = row
+            if hashlib.sha1(data).hexdigest() != sha1:
+                print(f"Dropping corrupt cached icon for {url}")
+                self._delete(url)
+                return None
+            with self.conn:
+                self.conn.execute("UPDATE icons SET accessed = ? WHERE url = ?", (time.time(), url))
+            return data
+
+    def put(self, url: str, data: bytes) -> None:
+        with self.lock:
+            with self.conn:
+                old = self.conn.execute("SELECT size FROM icons WHERE url = ?", (url,)).fetchone()
+                self.conn.execute("INSERT OR REPLACE INTO icons (url, data, size, sha1, accessed) VALUES (?, ?, ?, ?, ?)",
+                                  (url, data, len(data), hashlib.sha1(data).hexdigest(), time.time()))
+            self.total_bytes += len(data) - (old[0] if old else 0)
+            self._evict()
+
+    def discard(self, url: str) -> None:
+        with self.lock:
+            self._delete(url)
+
+    def missing(self, urls: Iterable[str]) -> List[str]:
+        with self.lock:
+            have = {row[0] for row in self.conn.execute("SELECT url FROM icons")}
+        return list({url for url in urls if url and url not in have})
+
+    def _delete(self, url: str) -> None:
+        with self.conn:
+            row = self.conn.execute("SELECT size FROM icons WHERE url = ?", (url,)).fetchone()
+            if row:
+                self.conn.execute("DELETE FROM icons WHERE url = ?", (url,))
+                self.total_bytes -= row[0]
+
+    def _evict(self) -> None:
+        while self.total_bytes > self.max_bytes:
+            with self.conn:
+                rows = self.conn.execute("SELECT url, size FROM icons ORDER BY accessed LIMIT ?", (EVICT_BATCH,)).fetchall()
+                if not rows:
+                    self.total_bytes = 0
+                    return
+                for url, size in rows:
+                    self.conn.execute("DELETE FROM icons WHERE url = ?", (url,))
+                    self.total_bytes -= size
+                    if self.total_bytes <= self.max_bytes:
+                        break
+
+    # Moves thumbnails from the old one-PNG-per-URL image_cache directory into
+    # the store.  `encode` turns a legacy file path into the bytes to keep.
+    def import_legacy(self, url: str, legacy_dir: str, encode) -> Optional[bytes]:
+        legacy_path = os.path.join(legacy_dir, hashlib.md5(url.encode()).hexdigest() + '.png')
+        if not os.path.isfile(legacy_path):
+            return None
+        try:
+            data = encode(legacy_path)
+            self.put(url, data)
+        except Exception as e:
+            print(f"Skipping unreadable cached icon {legacy_path}: {e}")
+            data = None
+        try:
+            os.remove(legacy_path)
+        except OSError:
+            pass
+        return data
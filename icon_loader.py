@@ -0,0 +1,103 @@
+import queue
+import itertools
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Generic, Hashable, Iterable, Optional, TypeVar
+
+V = TypeVar('V')
+
+# Fixed pool of icon workers fed from a priority queue.  A clicked row is
+# requested at FOREGROUND priority and always jumps ahead of the speculative
+# BACKGROUND prefetches for rows that are merely visible.  Every submission
+# carries the generation it was made in; starting a new request or prefetch
+# batch bumps the generation so stale work is skipped when it is dequeued and
+# its result is never delivered.
+
+FOREGROUND = 0
+BACKGROUND = 1
+
+
+class LruCache(Generic[V]):
+    def __init__(self, max_items: int) -> None:
+        self.max_items = max_items
+        self.items: 'OrderedDict[Hashable, V]' = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[V]:
+        with self.lock:
+            value = self.items.get(key)
+            if value is not None:
+                self.items.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value: V) -> None:
+        with self.lock:
+            self.items[key] = value
+            self.items.move_to_end(key)
+            while len(self.items) > self.max_items:
+                self.items.popitem(last=False)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self.lock:
+            return key in self.items
+
+
+class IconLoader(Generic[V]):
+    def __init__(self, load: Callable[[str], V], workers: int = 4, cache_size: int = 256) -> None:
+        self.load = load
+        self.cache: LruCache[V] = LruCache(cache_size)
+        self.jobs: queue.PriorityQueue = queue.PriorityQueue()
+        self.counter = itertools.count()
+        self.generations = [0, 0]
+        self.loading: Dict[str, threading.Event] = {}
+        self.lock = threading.Lock()
+        for i in range(workers):
+            threading.Thread(target=self._worker, name=f'icon-{i}', daemon=True).start()
+
+    def request(self, url: str, callback: Callable[[V], None]) -> None:
+        self._submit(FOREGROUND, [(url, callback)])
+
+    def prefetch(self, urls: Iterable[str]) -> None:
+        self._submit(BACKGROUND, [(url, None) for url in urls if url not in self.cache])
+
+    def _submit(self, priority: int, jobs) -> None:
+        with self.lock:
+            self.generations[priority] += 1
+            generation = self.generations[priority]
+        for url, callback in jobs:
+            self.jobs.put((priority, next(self.counter), url, callback, generation))
+
+    def _worker(self) -> None:
+        while True:
+            priority, _, url, callback, generation = self.jobs.get()
+            if generation != self.generations[priority]:
+                continue
+            value = self.cache.get(url)
+            if value is None:
+                value = self._load_once(url)
+            # None tells the caller the load failed.
+            if callback and generation == self.generations[priority]:
+                callback(value)
+
+    # Two workers asked for the same URL (a prefetch then a click) share one
+    # load; the second waits for the first and reads the cache.
+    def _load_once(self, url: str) -> Optional[V]:
+        with self.lock:
+            event = self.loading.get(url)
+            owner = event is None
+            if owner:
+                event = self.loading[url] = threading.Event()
+        if not owner:
+            event.wait()
+            return self.cache.get(url)
+        try:
+            value = self.load(url)
+            self.cache.put(url, value)
+            return value
+        except Exception as e:
+            print(f"Error loading icon {url}: {e}")
+            return None
+        finally:
+            with self.lock:
+                del self.loading[url]
+            event.set()
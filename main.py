@@ -1,259 +1,204 @@
 import os
 import sys
-import re
-import json
-import hashlib
 import threading
-import queue
+import multiprocessing
 import time
 import tkinter as tk
 from tkinter import ttk, filedialog
 from PIL import Image, ImageTk
 import requests
 from io import BytesIO
-from thefuzz import fuzz, process
-from typing import Dict, Optional
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Optional, Tuple
 from ttkbootstrap import Style
+from paths import script_dir, static_dir
+from file_manager import FileManager
+from search_index import SearchWorker
+from selection import select_files
+from virtual_list import VirtualList
+from icon_loader import IconLoader
+from icon_cache import IconCache
+from ui_dispatch import UiDispatcher
+import perf
+from transfer_queue import FINISHED, RUNNING, TransferJob, TransferQueue, build_job, prefetch_job
+from staging import InputStager
 
 sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ACORN'))
-from acorn import create_multi_xci, get_default_output_dir, cleanup_session_temp
+from acorn import get_default_output_dir, cleanup_session_temp
 import atexit
 
-static_dir = os.path.dirname(os.path.abspath(__file__))
-script_dir = os.path.dirname(sys.executable) if getattr(sys, 'frozen', False) else os.path.dirname(os.path.abspath(__file__))
-
-NSZ_PATTERN = re.compile(r"(?P<name>.*)\[(?:(?P<titleid>[A-Za-z0-9]{16}).*|\[(?P<region>[A-Z]{2})\].*|\[v(?P<version>\d{1,})\].*){2}(?:\.nsz|\.nsp)")
-
-class FileManager:
-    def __init__(self, game_manager=None, image_manager=None) -> None:
-        self.files: Dict[str, Dict] = {}
-        self.choices: Dict[str, str] = {}
-        self.titles_db_path = os.path.join(script_dir, "titledb", "titles.json")
-        self.titles_db_url = "https://tinfoil.media/repo/db/titles.json"
-        self.load_count = 0
-        self.chunk_size = 100
-        self.game_manager = game_manager
-        self.image_manager = image_manager
-
-        os.makedirs(os.path.dirname(self.titles_db_path), exist_ok=True)
-
-    def load_data(self, filepath: str) -> None:
-        try:
-            if os.path.exists(filepath):
-                with open(filepath, 'r') as file:
-                    self.files = json.load(file)
-                    self.load_count = 0
-                    self.populate_treeview()
-                    self.update_choices()
-        except (json.JSONDecodeError, IOError) as e:
-            print(f"Error loading data: {e}")
-
-    def update_choices(self) -> None:
-        for key, file_data in self.files.items():
-            if file_data.get('id') and file_data.get('name'):
-                self.choices[key] = f"{file_data['name']} {file_data['id']}"
-
-    def sort_files_by_rank(self) -> None:
-        sorted_keys = sorted(self.files, key=lambda x: self.files[x].get('rank', 999999))
-        self.files = {key: self.files[key] for key in sorted_keys}
-
-    def type_check(self, check_digit: str) -> str:
-        type_mapping = {"000": "base", "800": "update"}
-        return type_mapping.get(check_digit, "dlc")
-
-    def download_titles_db(self) -> bool:
-        try:
-            response = requests.get(self.titles_db_url)
-            response.raise_for_status()
-            with open(self.titles_db_path, 'wb') as file:
-                file.write(response.content)
-            return True
-        except requests.RequestException as e:
-            print(f"Failed to download titles.json: {e}")
-            return False
-
-    def scan_files(self, directory, pattern):
-        scanned_files = []
-        stack = [directory]
-        while stack:
-            current_dir = stack.pop()
-            with os.scandir(current_dir) as it:
-                for entry in it:
-                    if entry.is_dir(follow_symlinks=False):
-                        stack.append(entry.path)
-                    elif entry.is_file(follow_symlinks=False) and pattern.search(entry.name):
-                        scanned_files.append(entry.path)
-        return scanned_files
-
-    def refresh_files_thread(self, directory: str) -> None:
-        thread = threading.Thread(target=self._refresh_files, args=(directory,))
-        thread.start()
-
-    def _refresh_files(self, directory: str) -> None:
-        self.game_manager.progress_bar.config(mode='indeterminate')
-        self.game_manager.progress_bar.start(10)
-        self.files.clear()
-        self.choices.clear()
-
-        titles_db_available = os.path.exists(self.titles_db_path) or self.download_titles_db()
-        scanned_files = self.scan_files(directory, NSZ_PATTERN)
-
-        for filename in scanned_files:
-            match = NSZ_PATTERN.search(os.path.basename(filename))
-            titleid = match.group('titleid')
-            if titleid:
-                file_type = self.type_check(titleid[-3:])
-                key = f"{int(titleid, 16)-0x1000:0{16}X}"[:-3] if file_type == 'dlc' else titleid[:-3]
-                if key not in self.files:
-                    self.files[key] = {
-                        'name': match.group('name').strip() or None,
-                        'id': titleid,
-                        'region': match.group('region') or None,
-                        'size': None,
-                        'base': [],
-                        'update': [],
-                        'dlc': [],
-                        'intro': None,
-                        'iconUrl': None,
-                    }
-                self.files[key][file_type].append(filename)
-                self.choices[key] = f"{match.group('name')} {titleid}"
-
-        if titles_db_available:
-            try:
-                with open(self.titles_db_path, "r") as file:
-                    data = json.load(file)
-                    for title in data:
-                        title_data = data[title]
-                        if title_data['id']:
-                            key = title_data['id'][:-3]
-                            if self.type_check(title_data['id'][-3:]) == "base" and key in self.files:
-                                self.choices[key] = f"{title_data['name']} {title_data['id']}"
-                                del title_data['description']
-                                del title_data['regions']
-                                self.files[key].update(title_data)
-            except (json.JSONDecodeError, IOError) as e:
-                print(f"Error reading titles database: {e}")
-
-        self.sort_files_by_rank()
-        
-        try:
-            with open(os.path.join(script_dir, "result.json"), 'w') as fp:
-                json.dump(self.files, fp)
-            self.load_count = 0
-            self.populate_treeview()
-        except IOError as e:
-            print(f"Error saving data: {e}")
-        finally:
-            self.game_manager.progress_var.set(0)
-            self.game_manager.progress_bar.config(mode='determinate')
-            self.game_manager.progress_bar.stop()
-
-    def populate_treeview(self) -> None:
-        self.clear_treeview()
-        self.load_more_items()
-
-    def load_more_items(self) -> None:
-        count = 0
-        keys = list(self.files.keys())[self.load_count:self.load_count + self.chunk_size]
-        for key in keys:
-            self.game_manager.treeview.insert("", tk.END, text=self.files[key]['name'] or '', values=(self.files[key]['id'], self.files[key]['region'] or ''))
-            count += 1
-        self.load_count += count
-    
-    def clear_treeview(self) -> None:
-        self.game_manager.treeview.delete(*self.game_manager.treeview.get_children())
-
-    def refresh(self) -> None:
-        directory = filedialog.askdirectory()
-        if directory:
-            self.refresh_files_thread(directory)
+# Jobs handed to the transfer queue at a time by Queue All Listed Games.
+QUEUE_BATCH = 50
 
 class ImageManager:
     def __init__(self, game_manager=None, file_manager=None) -> None:
-        self.image_queue: queue.Queue = queue.Queue()
-        self.stop_event: threading.Event = threading.Event()
         self.current_item: Optional[str] = None
+        self.label: Optional[ttk.Label] = None
+        # Only read to migrate icons cached by older versions.
         self.cache_dir: str = os.path.join(script_dir, "image_cache")
-        os.makedirs(self.cache_dir, exist_ok=True)
         self.default_image_path: str = os.path.join(static_dir, "images", "no_image.png")
         self.transparent_image_path: str = os.path.join(static_dir, "images", "loading.png")
         self.game_manager = game_manager
         self.file_manager = file_manager
-
-    def fetch_image_data(self, url: str, item: str, label: ttk.Label) -> None:
-        try:
-            if self.stop_event.is_set():
-                return
-
-            if url and "http" in url:
-                filename = hashlib.md5(url.encode()).hexdigest() + '.png'
-                filepath = os.path.join(self.cache_dir, filename)
-            else:
-                filepath = self.default_image_path
-
-            if "http" in str(url) and not os.path.isfile(filepath):
-                response = requests.get(url)
-                response.raise_for_status()
-                with Image.open(BytesIO(response.content)) as img:
-                    img.thumbnail((200, 200), Image.LANCZOS)
-                    img.save(filepath)
-
-            if not os.path.isfile(filepath):
-                filepath = self.default_image_path
-
-            with Image.open(filepath) as img:
-                img.thumbnail((200, 200), Image.LANCZOS)
-                photo = ImageTk.PhotoImage(img)
-                if not self.stop_event.is_set() and item == self.current_item:
-                    self.image_queue.put(photo)
-
-        except requests.HTTPError as e:
-            print(f"HTTP error occurred: {e}")
-            self.load_default_image(item, self.default_image_path)
-        except Exception as e:
-            print(f"Error processing image: {e}")
-            self.load_default_image(item, self.default_image_path)
+        self.workers = 4
+        self.prefetch_pages = 1
+        self.icon_cache_budget = 256 * 1024 * 1024
+        self.icon_cache = IconCache(os.path.join(script_dir, "icon_cache.sqlite"), self.icon_cache_budget)
+        self.session = requests.Session()
+        self.session.mount('https://', requests.adapters.HTTPAdapter(pool_maxsize=self.workers))
+        self.session.mount('http://', requests.adapters.HTTPAdapter(pool_maxsize=self.workers))
+        self.loader: IconLoader[Image.Image] = IconLoader(self.load_thumbnail, workers=self.workers)
+
+    def load_thumbnail(self, url: str) -> Image.Image:
+        if not (url and "http" in url):
+            return self.load_local_image(self.default_image_path)
+
+        data = self.icon_cache.get(url) or self.icon_cache.import_legacy(url, self.cache_dir, self.encode_file)
+        if data is not None:
+            perf.count('icon.cache_hit')
+            try:
+                return self.decode_thumbnail(data)
+            except Exception as e:
+                print(f"Dropping undecodable cached icon for {url}: {e}")
+                self.icon_cache.discard(url)
+
+        perf.count('icon.cache_miss')
+        data = self.download_thumbnail(url)
+        self.icon_cache.put(url, data)
+        return self.decode_thumbnail(data)
+
+    def download_thumbnail(self, url: str) -> bytes:
+        with perf.span('icon.fetch', url=url) as span:
+            response = self.session.get(url, timeout=30)
+            response.raise_for_status()
+            span.bytes = len(response.content)
+        with Image.open(BytesIO(response.content)) as img:
+            return self.encode_thumbnail(img)
+
+    def encode_file(self, path: str) -> bytes:
+        with Image.open(path) as img:
+            return self.encode_thumbnail(img)
+
+    def encode_thumbnail(self, img: Image.Image) -> bytes:
+        # Stored already shrunk; JPEG decodes faster than PNG and is far
+        # smaller, PNG is only kept for icons that need transparency.
+        img.thumbnail((200, 200), Image.LANCZOS)
+        buffer = BytesIO()
+        if img.mode in ('RGBA', 'LA') or 'transparency' in img.info:
+            img.save(buffer, format='PNG')
+        else:
+            img.convert('RGB').save(buffer, format='JPEG', quality=90)
+        return buffer.getvalue()
+
+    def decode_thumbnail(self, data: bytes) -> Image.Image:
+        with perf.span('icon.decode') as span:
+            span.bytes = len(data)
+            img = Image.open(BytesIO(data))
+            img.load()
+        return img
+
+    def prewarm_cache(self, urls, progress=None) -> Tuple[int, int]:
+        todo = self.icon_cache.missing(url for url in urls if url and "http" in url)
+        done = failed = 0
+
+        def collect(finished) -> None:
+            nonlocal done, failed
+            for future in finished:
+                try:
+                    future.result()
+                    done += 1
+                except Exception as e:
+                    print(f"Error prewarming icon: {e}")
+                    failed += 1
+                if progress:
+                    progress(done + failed, len(todo))
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            pending = set()
+            for url in todo:
+                # Keep a bounded number of downloads queued instead of
+                # submitting the whole library up front.
+                if len(pending) >= self.workers * 2:
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(finished)
+                pending.add(pool.submit(self.prewarm_one, url))
+            collect(wait(pending).done)
+        return done, failed
+
+    def prewarm_one(self, url: str) -> None:
+        self.icon_cache.put(url, self.download_thumbnail(url))
+
+    def load_local_image(self, path: str) -> Image.Image:
+        with Image.open(path) as img:
+            img.thumbnail((200, 200), Image.LANCZOS)
+            return img.copy()
+
+    def show(self, item: str, img: Optional[Image.Image]) -> None:
+        if item == self.current_item:
+            self.game_manager.dispatcher.post(self.display_image, item, img)
 
     def load_default_image(self, item: str, img_path: str) -> None:
-        if not self.stop_event.is_set() and item == self.current_item:
-            with Image.open(img_path) as img:
-                img.thumbnail((200, 200), Image.LANCZOS)
-                photo = ImageTk.PhotoImage(img)
-                self.image_queue.put(photo)
-
-    def check_queue(self, label: ttk.Label) -> None:
-        try:
-            photo = self.image_queue.get_nowait()
-            label.config(image=photo)
-            label.image = photo
-        except queue.Empty:
-            pass
-        label.after(100, self.check_queue, label)
+        img = self.loader.cache.get(img_path)
+        if img is None:
+            img = self.load_local_image(img_path)
+            self.loader.cache.put(img_path, img)
+        self.show(item, img)
+
+    def display_image(self, item: str, img: Optional[Image.Image]) -> None:
+        # PhotoImage has to be created on the Tk thread.
+        if item != self.current_item:
+            return
+        if img is None:
+            self.load_default_image(item, self.default_image_path)
+            return
+        photo = ImageTk.PhotoImage(img)
+        self.label.config(image=photo)
+        self.label.image = photo
 
     def start_fetch_thread(self, url: str, item: str, label: ttk.Label) -> None:
         if item == self.current_item:
             return
-        self.stop_event.set()
-        with self.image_queue.mutex:
-            self.image_queue.queue.clear()
-        self.stop_event.clear()
         self.current_item = item
+        self.label = label
+        cached = self.loader.cache.get(url)
+        if cached is not None:
+            self.show(item, cached)
+            return
         self.load_default_image(item, self.transparent_image_path)
-        threading.Thread(target=self.fetch_image_data, args=(url, item, label)).start()
+        self.loader.request(url, lambda img: self.show(item, img))
+
+    def prefetch(self, urls) -> None:
+        self.loader.prefetch(url for url in urls if url and "http" in url)
 
 class GameManager:
     def __init__(self, root: tk.Tk) -> None:
         self.root = root
+        self.perf_log_path = os.path.join(script_dir, "perf.log")
+        # EMUROM_PERF=1 records spans from startup, not only while the stats
+        # window is open.
+        self.perf_always = bool(os.environ.get('EMUROM_PERF'))
+        if self.perf_always:
+            perf.enable(self.perf_log_path)
+        self.stats_window: Optional[tk.Toplevel] = None
         self.file_manager = FileManager(game_manager=self)
         self.image_manager = ImageManager(game_manager=self)
         self.file_manager.image_manager = self.image_manager
+        self.search_worker = SearchWorker(self.file_manager.search_index)
         self.setup_ui()
-        self.file_manager.load_data(os.path.join(script_dir, "result.json"))
-        self.image_manager.check_queue(self.image_label)
-        self.transfer_in_progress = False
+        # Show the top of the list straight away and read the rest of the
+        # catalog in the background.
+        if self.file_manager.load_first_page(self.virtual_list.window):
+            self.file_manager.populate_treeview()
+            self.file_manager.load_data_background(lambda: self.dispatcher.post(self.library_changed))
         self.output_dir = get_default_output_dir()
         self.current_game = None
+        self.current_key = None
+        self.transfer_concurrency = 2
+        # Copies the inputs of queued jobs off network shares ahead of their build.
+        self.stager = InputStager()
+        atexit.register(self.cleanup_temp)
+        self.transfer_queue = TransferQueue(self.decompress_and_create_xci, max_concurrency=self.transfer_concurrency,
+                                            on_change=self.job_changed)
 
     def setup_ui(self) -> None:
         self.root.geometry("800x600")
@@ -289,7 +234,20 @@ class GameManager:
                 borderwidth=2,
                 relief='raised')
 
+        self.menu = tk.Menu(self.root)
+        self.tools_menu = tk.Menu(self.menu, tearoff=0)
+        self.tools_menu.add_command(label="Queue All Listed Games", command=self.queue_listed_games)
+        self.tools_menu.add_command(label="Prewarm Icon Cache", command=self.prewarm_icon_cache)
+        self.watch_var = tk.BooleanVar(value=False)
+        self.tools_menu.add_checkbutton(label="Watch Input Folder", variable=self.watch_var, command=self.toggle_watch)
+        self.stats_var = tk.BooleanVar(value=False)
+        self.tools_menu.add_checkbutton(label="Performance Stats", variable=self.stats_var, command=self.toggle_stats)
+        self.menu.add_cascade(label="Tools", menu=self.tools_menu)
+        self.root.config(menu=self.menu)
+
         self.query = tk.StringVar(value='Search...')
+        # While set the field only shows the placeholder, there is no query.
+        self.placeholder_shown = True
 
         self.root.grid_rowconfigure(0, weight=0)
         self.root.grid_rowconfigure(1, weight=0)
@@ -363,11 +321,27 @@ class GameManager:
         self.transfer_frame = ttk.Frame(master=self.root, padding=(10, 5))
         self.transfer_frame.grid(row=3, column=0, columnspan=3, padx=5, pady=5, sticky='nsew')
         self.transfer_frame.grid_propagate(False)
-        self.transfer_frame.grid_rowconfigure(0, weight=1)
+        self.transfer_frame.grid_rowconfigure(0, weight=0)
+        self.transfer_frame.grid_rowconfigure(1, weight=1)
         self.transfer_frame.grid_columnconfigure(0, weight=1)
 
+        self.jobs_view = ttk.Treeview(master=self.transfer_frame, columns=("status", "speed", "eta"), selectmode='extended', height=2)
+        self.jobs_view.heading("#0", text="Queued Game", anchor="w")
+        self.jobs_view.column("#0", stretch=tk.YES, width=420)
+        self.jobs_view.heading("status", text="Status", anchor="w")
+        self.jobs_view.column("status", stretch=tk.YES, width=110)
+        self.jobs_view.heading("speed", text="Speed", anchor="w")
+        self.jobs_view.column("speed", stretch=tk.YES, width=110)
+        self.jobs_view.heading("eta", text="ETA", anchor="w")
+        self.jobs_view.column("eta", stretch=tk.YES, width=90)
+        self.jobs_view.grid(row=0, column=0, sticky="ew", pady=(0, 5))
+
         self.output_text = tk.Text(master=self.transfer_frame, bg="#2e2e2e", fg="#ffffff", insertbackground="white")
-        self.output_text.grid(row=0, column=0, sticky="nsew")
+        self.output_text.grid(row=1, column=0, sticky="nsew")
+
+        self.dispatcher = UiDispatcher(self.root, self.output_text, self.progress_var)
+        # Runs once mainloop() has started, for anything a worker posted before.
+        self.root.after_idle(self.dispatcher.wake)
 
     def create_treeview(self, frame: tk.Frame) -> ttk.Treeview:
         treeview = ttk.Treeview(master=frame, columns=("titleid", "region"), selectmode='browse', height=4)
@@ -378,40 +352,110 @@ class GameManager:
         treeview.heading("region", text="Region", anchor="w")
         treeview.column("region", stretch=tk.YES, minwidth=100, width=100)
         treeview.grid(row=0, column=0, sticky='nsew')
-        vscroll = ttk.Scrollbar(master=frame, orient="vertical", command=treeview.yview)
-        treeview.configure(yscrollcommand=vscroll.set)
+        vscroll = ttk.Scrollbar(master=frame, orient="vertical")
         vscroll.grid(row=0, column=1, sticky='ns')
         treeview.bind('<Button-1>', self.on_row_click)
-        treeview.bind('<MouseWheel>', self.on_treeview_scroll)
-        vscroll.bind('<ButtonRelease-1>', self.on_treeview_scroll)
-        treeview.bind('<KeyPress>', self.on_treeview_scroll)
+        self.virtual_list = VirtualList(treeview, vscroll, self.treeview_row)
+        self.virtual_list.on_change = self.prefetch_visible_icons
         return treeview
-    
-    def on_treeview_scroll(self, event: tk.Event) -> None:
-        if self.treeview.yview()[1] > 0.99:
-            self.file_manager.load_more_items()
+
+    def prefetch_visible_icons(self) -> None:
+        # Visible rows first, then the next page(s) the user is likely to scroll to.
+        window = self.virtual_list.window * (1 + self.image_manager.prefetch_pages)
+        keys = self.virtual_list.keys[self.virtual_list.offset:self.virtual_list.offset + window]
+        files = self.file_manager.files
+        self.image_manager.prefetch(files[key].get('iconUrl') for key in keys if key in files)
+
+    def treeview_row(self, key: str) -> tuple:
+        game = self.file_manager.files.get(key) or {}
+        return game.get('name') or '', (game.get('id') or '', game.get('region') or '')
+
+    def active_query(self) -> str:
+        return '' if self.placeholder_shown else self.search_field.get()
 
     def search(self, event: tk.Event) -> None:
-        self.file_manager.load_count = 0
-        self.treeview.yview_moveto(0)
-        if not self.search_field.get():
+        query = self.active_query()
+        if not query:
+            self.search_worker.cancel()
             self.file_manager.populate_treeview()
             return
-        self.file_manager.clear_treeview()
-        results = process.extract(self.search_field.get(), self.file_manager.choices, limit=100, scorer=fuzz.partial_token_sort_ratio)
-        for result in results:
-            id = result[2]
-            self.treeview.insert("", tk.END, text=self.file_manager.files[id]['name'], values=(self.file_manager.files[id]['id'], self.file_manager.files[id]['region']))
+        self.search_worker.submit(query, lambda query, keys: self.dispatcher.post(self.show_search_results, query, keys))
 
-    def on_row_click(self, event: tk.Event) -> None:
-        if self.transfer_in_progress:
+    def toggle_stats(self) -> None:
+        if not self.stats_var.get():
+            self.close_stats()
             return
-        row_id = event.widget.identify_row(event.y)
-        if row_id:
-            item = event.widget.item(row_id, 'values')
-            key = item[0][:-3]
+        perf.enable(self.perf_log_path)
+        window = self.stats_window = tk.Toplevel(self.root)
+        window.title("Performance Stats")
+        window.geometry("640x320")
+        window.protocol("WM_DELETE_WINDOW", self.close_stats)
+        columns = ("count", "last", "p50", "p95", "throughput")
+        view = ttk.Treeview(window, columns=columns)
+        view.heading("#0", text="Span")
+        view.column("#0", width=180)
+        for column in columns:
+            view.heading(column, text=column.capitalize())
+            view.column(column, width=85, anchor=tk.E)
+        view.pack(fill=tk.BOTH, expand=True)
+        ttk.Label(window, text=f"Log: {self.perf_log_path}").pack(anchor=tk.W, padx=5, pady=2)
+        self.refresh_stats(view)
+
+    def refresh_stats(self, view: ttk.Treeview) -> None:
+        if self.stats_window is None or not view.winfo_exists():
+            return
+        ms = lambda value: f"{value:.1f} ms" if value is not None else ""
+        rows = perf.summary()
+        for row in rows:
+            rate = row['bytes_per_s']
+            values = (row['count'], ms(row['last_ms']), ms(row['p50_ms']), ms(row['p95_ms']),
+                      f"{rate / (1024 * 1024):.1f} MB/s" if rate else "")
+            if view.exists(row['name']):
+                view.item(row['name'], values=values)
+            else:
+                view.insert("", tk.END, iid=row['name'], text=row['name'], values=values)
+        # Only ticks while the window is open.
+        self.root.after(1000, self.refresh_stats, view)
+
+    def close_stats(self) -> None:
+        self.stats_var.set(False)
+        if self.stats_window is not None:
+            self.stats_window.destroy()
+            self.stats_window = None
+        if not self.perf_always:
+            perf.disable()
+
+    def toggle_watch(self) -> None:
+        if not self.watch_var.get():
+            self.file_manager.stop_watching()
+            self.update_transfer_ui(text="Stopped watching the input folder.\n")
+            return
+        directory = self.file_manager.start_watching()
+        if directory:
+            self.update_transfer_ui(text=f"Watching {directory} for changes.\n")
+        else:
+            self.watch_var.set(False)
+            self.update_transfer_ui(text="Select an input folder first.\n")
+
+    # After the background load or a watched change: re-run a real query,
+    # otherwise redraw the library where the user had scrolled to.
+    def library_changed(self) -> None:
+        if self.active_query():
+            self.search(None)
+        else:
+            self.virtual_list.set_keys(self.file_manager.ordered_keys, keep_offset=True)
+
+    def show_search_results(self, query: str, keys: list) -> None:
+        if query != self.active_query():
+            return
+        self.virtual_list.set_keys([key for key in keys if key in self.file_manager.files])
 
+    def on_row_click(self, event: tk.Event) -> None:
+        row_id = event.widget.identify_row(event.y)
+        key = self.virtual_list.key_for_row(row_id) if row_id else None
+        if key in self.file_manager.files:
             self.current_game = self.file_manager.files[key]
+            self.current_key = key
 
             self.game_name_label.config(text=self.current_game['name'])
             self.game_intro_label.config(text=self.current_game['intro'] or "")
@@ -419,94 +463,170 @@ class GameManager:
             self.enable_transfer_button()
 
             icon_url = self.current_game.get('iconUrl', os.path.join(script_dir, "images", "no_image.png"))
-            self.image_manager.start_fetch_thread(icon_url, row_id, self.image_label)
+            self.image_manager.start_fetch_thread(icon_url, key, self.image_label)
+
+    def prewarm_icon_cache(self) -> None:
+        urls = [game.get('iconUrl') for game in self.file_manager.files.values()]
+        self.tools_menu.entryconfig("Prewarm Icon Cache", state=tk.DISABLED)
+
+        def finished() -> None:
+            self.progress_var.set(0)
+            self.tools_menu.entryconfig("Prewarm Icon Cache", state=tk.NORMAL)
+
+        def run():
+            try:
+                self.update_transfer_ui(text="Prewarming icon cache...\n")
+                fetched, failed = self.image_manager.prewarm_cache(
+                    urls, progress=lambda count, total: self.update_transfer_ui(progress=100 * count / total))
+                self.update_transfer_ui(text=f"Icon cache prewarmed: {fetched} fetched, {failed} failed\n")
+            except Exception as e:
+                self.update_transfer_ui(text=f"Error prewarming icon cache: {e}\n")
+            finally:
+                self.dispatcher.post(finished)
+
+        threading.Thread(target=run, daemon=True).start()
 
     def update_transfer_ui(self, text: Optional[str] = None, progress: Optional[int] = None, info: Optional[str] = None, filename: Optional[str] = None) -> None:
+        # Safe from any thread, applied by the dispatcher on the Tk thread.
         if text:
-            self.output_text.insert(tk.END, text)
-            self.output_text.see(tk.END)
-            self.root.update_idletasks()  # Force immediate GUI update for real-time output
+            self.dispatcher.log(text)
         if progress is not None:
-            self.progress_var.set(progress)
-            self.root.update_idletasks()  # Force immediate progress update
+            self.dispatcher.set_progress(progress)
+
+    def start_busy(self) -> None:
+        self.progress_bar.config(mode='indeterminate')
+        self.progress_bar.start(10)
+
+    def stop_busy(self) -> None:
+        self.progress_var.set(0)
+        self.progress_bar.config(mode='determinate')
+        self.progress_bar.stop()
 
-    def start_process(self, game: Dict) -> None:
-        self.transfer_in_progress = True
+    def start_process(self, key: str) -> None:
         # Use default output directory if not set
         if not self.output_dir:
             self.output_dir = get_default_output_dir()
-        self.current_game_files = game['base'] + game['update'] + game['dlc']
-        self.output_text.delete('1.0', tk.END)
-        self.progress_var.set(0)
-        self.disable_transfer_button()
-        self.enable_cancel_button()
-        threading.Thread(target=self.decompress_and_create_xci).start()
+        job = self.make_job(key, self.output_dir)
+        if job:
+            self.add_jobs([job])
+
+    # Stats every input file and checks where it lives, so whole lists of
+    # titles are turned into jobs off the Tk thread.
+    def make_job(self, key: str, output_dir: str) -> Optional[TransferJob]:
+        game = self.file_manager.files.get(key)
+        if not game:
+            return None
+        name = game['name'] or key
+        selection = select_files(game)
+        if selection.dropped:
+            self.update_transfer_ui(text=selection.describe(name))
+        job = TransferJob(key, name, selection.files, output_dir, game.get('versions'))
+        # Before add(), which may start the build straight away.
+        prefetch_job(job, self.stager)
+        return job
+
+    def add_jobs(self, jobs: list) -> None:
+        for job in jobs:
+            self.transfer_queue.add(job)
+        if jobs:
+            self.enable_cancel_button()
+
+    def queue_listed_games(self) -> None:
+        if not self.output_dir:
+            self.output_dir = get_default_output_dir()
+        keys = list(self.virtual_list.keys)
+        output_dir = self.output_dir
+        self.tools_menu.entryconfig("Queue All Listed Games", state=tk.DISABLED)
 
-    def decompress_and_create_xci(self) -> None:
-        try:
-            self.update_transfer_ui(text="Starting XCI creation with ACORN...\n")
-            
-            result = create_multi_xci(
-                files=self.current_game_files,
-                output_folder=self.output_dir,
-                text_file=None,
-                buffer_size=65536,
-                progress_callback=lambda msg: self.update_transfer_ui(text=msg)
-            )
-            
-            if result == 0:
-                self.update_transfer_ui(text="XCI creation completed successfully!\n")
-                self.progress_var.set(100)
-            else:
-                self.update_transfer_ui(text="XCI creation failed.\n")
-                
-        except Exception as e:
-            self.update_transfer_ui(text=f"An error occurred: {e}\n")
-            self.delete_output_files()
-        finally:
-            self.progress_var.set(0)
-            self.progress_bar.stop()
-            self.enable_transfer_button()
-            self.disable_cancel_button()
-            self.transfer_in_progress = False
+        def finished() -> None:
+            self.tools_menu.entryconfig("Queue All Listed Games", state=tk.NORMAL)
 
-    def cancel_transfer(self) -> None:
-        if self.transfer_in_progress:
-            self.update_transfer_ui(text="Transfer canceled by user.\n")
-            self.delete_output_files()
-            self.transfer_in_progress = False
-            self.progress_var.set(0)
-            self.progress_bar.stop()
-            self.enable_transfer_button()
+        def run():
+            try:
+                batch = []
+                for key in keys:
+                    job = self.make_job(key, output_dir)
+                    if job:
+                        batch.append(job)
+                    # Queued in batches so the first builds start early.
+                    if len(batch) >= QUEUE_BATCH:
+                        self.dispatcher.post(self.add_jobs, batch)
+                        batch = []
+                self.dispatcher.post(self.add_jobs, batch)
+            except Exception as e:
+                self.update_transfer_ui(text=f"Error queueing games: {e}\n")
+            finally:
+                self.dispatcher.post(finished)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def decompress_and_create_xci(self, job: TransferJob) -> None:
+        build_job(job, self.stager, on_message=lambda msg: self.update_transfer_ui(text=msg),
+                  on_progress=lambda job: self.dispatcher.post(self.update_job_row, job))
+
+    # Scratch copies of build inputs and ACORN's session temp folder, on exit.
+    def cleanup_temp(self) -> None:
+        self.stager.cleanup()
+        cleanup_session_temp()
+
+    def job_changed(self, job: TransferJob) -> None:
+        # Also covers jobs canceled before they ever started.
+        if job.status in FINISHED:
+            self.stager.release(job)
+        self.dispatcher.post(self.update_job_row, job)
+
+    def update_job_row(self, job: TransferJob) -> None:
+        iid = str(job.id)
+        eta = job.eta()
+        values = (
+            job.status,
+            f"{job.throughput() / (1024 * 1024):.1f} MB/s" if job.status == RUNNING else "",
+            time.strftime('%H:%M:%S', time.gmtime(eta)) if eta is not None else "",
+        )
+        if self.jobs_view.exists(iid):
+            self.jobs_view.item(iid, values=values)
+        else:
+            self.jobs_view.insert("", tk.END, iid=iid, text=job.name, values=values)
+
+        running = [j for j in self.transfer_queue.jobs if j.status == RUNNING]
+        known = [j.percent for j in running if j.percent is not None]
+        self.progress_var.set(sum(known) / len(known) if known else 0)
+        if not self.transfer_queue.active():
             self.disable_cancel_button()
 
-    def delete_output_files(self) -> None:
-        self.update_transfer_ui(text="No file cleanup needed\n")
+    def cancel_transfer(self) -> None:
+        selected = {int(iid) for iid in self.jobs_view.selection()}
+        for job in self.transfer_queue.active():
+            if not selected or job.id in selected:
+                self.update_transfer_ui(text=f"[{job.name}] Transfer canceled by user.\n")
+                self.transfer_queue.cancel(job)
 
     def disable_transfer_button(self) -> None:
         self.transfer_button.bind('<Button-1>', lambda e: None)
         self.transfer_button.config(state=tk.DISABLED)
 
     def enable_transfer_button(self) -> None:
-        self.transfer_button.bind('<Button-1>', lambda e: self.start_process(self.current_game))
+        self.transfer_button.bind('<Button-1>', lambda e: self.start_process(self.current_key))
         self.transfer_button.config(state=tk.NORMAL)
 
     def set_output_dir(self) -> None:
         directory = filedialog.askdirectory()
         if directory:
             self.output_dir = directory
-            self.enable_transfer_button()
+            if self.current_key:
+                self.enable_transfer_button()
 
     def on_entry_click(self, event: tk.Event) -> None:
-        if self.search_field.get() == 'Search...':
+        if self.placeholder_shown:
             self.search_field.delete(0, "end")
-            self.search_field.insert(0, '')
             self.search_field.config(foreground='white')
+            self.placeholder_shown = False
 
     def on_focusout(self, event: tk.Event) -> None:
         if self.search_field.get() == '':
             self.search_field.insert(0, 'Search...')
             self.search_field.config(foreground='grey')
+            self.placeholder_shown = True
 
     def disable_cancel_button(self) -> None:
         self.cancel_button.config(state=tk.DISABLED)
@@ -515,8 +635,7 @@ class GameManager:
         self.cancel_button.config(state=tk.NORMAL)
 
 if __name__ == "__main__":
-    # Register cleanup function to be called on exit
-    atexit.register(cleanup_session_temp)
+    multiprocessing.freeze_support()
     root = tk.Tk()
     app = GameManager(root)
     root.mainloop()
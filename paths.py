@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Bundled read-only assets live next to the code (inside the PyInstaller
+# bundle when frozen); everything the app writes goes next to the executable.
+static_dir = os.path.dirname(os.path.abspath(__file__))
+script_dir = os.path.dirname(sys.executable) if getattr(sys, 'frozen', False) else os.path.dirname(os.path.abspath(__file__))
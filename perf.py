@@ -0,0 +1,145 @@
+import json
+import time
+import logging
+import threading
+import statistics
+from collections import deque
+from logging.handlers import RotatingFileHandler
+from typing import Deque, Dict, List, Optional, Tuple
+
+# Timing spans for the slow paths.  Off by default: span() then hands back a
+# shared no-op object and count() returns straight away, so leaving the calls
+# in costs a global lookup and a function call.  Once enabled, every finished
+# span is appended as one JSON line to a rotating log and kept in a short
+# per-name history for the stats panel.
+#
+#   with perf.span('icon.fetch', url=url) as s:
+#       data = download(url)
+#       s.bytes = len(data)
+
+HISTORY = 200
+
+enabled = False
+_lock = threading.Lock()
+_history: Dict[str, Deque[Tuple[float, Optional[int]]]] = {}
+_span_counts: Dict[str, int] = {}
+_counters: Dict[str, int] = {}
+_logger: Optional[logging.Logger] = None
+
+
+class _NullSpan:
+    bytes = None
+
+    def __enter__(self) -> '_NullSpan':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+    def __setattr__(self, name, value) -> None:
+        pass
+
+    def add(self, **fields) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    def __init__(self, name: str, fields: Dict) -> None:
+        self.name = name
+        self.fields = fields
+        self.bytes: Optional[int] = None
+
+    def __enter__(self) -> 'Span':
+        self.start = time.perf_counter()
+        return self
+
+    def add(self, **fields) -> None:
+        self.fields.update(fields)
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is not None:
+            self.fields['error'] = exc_type.__name__
+        record(self.name, time.perf_counter() - self.start, self.bytes, **self.fields)
+
+
+def span(name: str, **fields):
+    if not enabled:
+        return _NULL_SPAN
+    return Span(name, fields)
+
+
+# For work timed some other way, or split out of a loop.
+def record(name: str, seconds: float, nbytes: Optional[int] = None, **fields) -> None:
+    if not enabled:
+        return
+    with _lock:
+        _history.setdefault(name, deque(maxlen=HISTORY)).append((seconds, nbytes))
+        _span_counts[name] = _span_counts.get(name, 0) + 1
+    if _logger:
+        entry = {'ts': round(time.time(), 3), 'span': name, 'ms': round(seconds * 1000, 3)}
+        if nbytes is not None:
+            entry['bytes'] = nbytes
+            if seconds > 0:
+                entry['bytes_per_s'] = round(nbytes / seconds)
+        entry.update(fields)
+        _logger.info(json.dumps(entry, default=str))
+
+
+def count(name: str, n: int = 1) -> None:
+    if not enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def enable(log_path: Optional[str] = None, max_bytes: int = 1 << 20, backups: int = 3) -> None:
+    global enabled, _logger
+    if log_path and _logger is None:
+        handler = RotatingFileHandler(log_path, maxBytes=max_bytes, backupCount=backups, encoding='utf-8')
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        _logger = logging.getLogger('emurom.perf')
+        _logger.setLevel(logging.INFO)
+        _logger.propagate = False
+        _logger.addHandler(handler)
+    enabled = True
+
+
+def disable() -> None:
+    global enabled
+    enabled = False
+
+
+def reset() -> None:
+    with _lock:
+        _history.clear()
+        _span_counts.clear()
+        _counters.clear()
+
+
+# One row per span name over its recent history, for the stats panel.
+def summary() -> List[Dict]:
+    with _lock:
+        history = {name: list(samples) for name, samples in _history.items()}
+        span_counts = dict(_span_counts)
+        counters = dict(_counters)
+    rows = []
+    for name in sorted(history):
+        samples = history[name]
+        times = sorted(seconds for seconds, _ in samples)
+        sized = [(seconds, nbytes) for seconds, nbytes in samples if nbytes is not None]
+        busy = sum(seconds for seconds, _ in sized)
+        rows.append({
+            'name': name,
+            'count': span_counts[name],
+            'last_ms': samples[-1][0] * 1000,
+            'p50_ms': statistics.median(times) * 1000,
+            'p95_ms': times[min(len(times) - 1, int(len(times) * 0.95))] * 1000,
+            'bytes_per_s': sum(nbytes for _, nbytes in sized) / busy if busy > 0 else None,
+        })
+    for name in sorted(counters):
+        rows.append({'name': name, 'count': counters[name], 'last_ms': None, 'p50_ms': None, 'p95_ms': None,
+                     'bytes_per_s': None})
+    return rows
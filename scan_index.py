@@ -0,0 +1,173 @@
+import os
+import json
+import threading
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from walker import DEFAULT_WORKERS, walk_parallel
+
+# Persistent record of the last library scan.  Every directory is stored with
+# its mtime, its subdirectories and the matching files it contained (with size
+# and mtime), so a rescan only has to list directories whose mtime moved.
+#
+# Adding, removing or renaming an entry updates the mtime of its parent
+# directory, which is all the filename based matching cares about.  A file
+# rewritten in place inside an unchanged directory is not noticed until
+# something else touches that directory.
+#
+# The file is read on first use rather than at startup, the window does not
+# need it, and only written back when a scan actually changed something.
+
+
+class ScanIndex:
+    VERSION = 1
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._root: Optional[str] = None
+        self._dirs: Dict[str, Dict] = {}
+        self.stats: Dict[str, int] = self._empty_stats()
+        self.loaded = False
+        self.load_lock = threading.Lock()
+        # Whether there is anything save() needs to write.
+        self.dirty = False
+
+    @property
+    def root(self) -> Optional[str]:
+        self._ensure_loaded()
+        return self._root
+
+    @property
+    def dirs(self) -> Dict[str, Dict]:
+        self._ensure_loaded()
+        return self._dirs
+
+    def _ensure_loaded(self) -> None:
+        if self.loaded:
+            return
+        with self.load_lock:
+            if not self.loaded:
+                self.load()
+                self.loaded = True
+
+    @staticmethod
+    def _empty_stats() -> Dict[str, int]:
+        return {
+            'dirs_skipped': 0,
+            'dirs_scanned': 0,
+            'files_skipped': 0,
+            'files_reprocessed': 0,
+            'files_removed': 0,
+        }
+
+    def load(self) -> None:
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r') as file:
+                    data = json.load(file)
+                if data.get('version') == self.VERSION:
+                    self._root = data.get('root')
+                    self._dirs = data.get('dirs', {})
+        except (json.JSONDecodeError, IOError) as e:
+            print(f"Error loading scan index: {e}")
+            self._root, self._dirs = None, {}
+
+    def save(self) -> None:
+        if not self.dirty:
+            return
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, 'w') as file:
+                json.dump({'version': self.VERSION, 'root': self._root, 'dirs': self._dirs}, file)
+            os.replace(tmp_path, self.path)
+            self.dirty = False
+        except IOError as e:
+            print(f"Error saving scan index: {e}")
+
+    def reset(self, root: Optional[str]) -> None:
+        self._ensure_loaded()
+        self._root = root
+        self._dirs = {}
+        self.dirty = True
+
+    # Yields ('added' | 'removed', path) deltas against the previous scan.  A
+    # file whose size or mtime changed is reported as removed and added again.
+    # Directory listings run on `workers` threads; the index itself is only
+    # updated from the calling thread.
+    def scan(self, directory: str, match: Callable[[str], object], workers: int = DEFAULT_WORKERS) -> Iterator[Tuple[str, str]]:
+        if self.root != directory:
+            self.reset(directory)
+        self.stats = self._empty_stats()
+        dirs = self.dirs
+        seen = set()
+
+        def visit(current_dir: str) -> Tuple[List[str], List[Tuple]]:
+            try:
+                mtime = os.stat(current_dir).st_mtime_ns
+            except OSError:
+                return [], []
+            cached = dirs.get(current_dir)
+            if cached and cached['mtime'] == mtime:
+                return cached['subdirs'], [(current_dir, mtime, cached, None, None)]
+
+            subdirs = []
+            files = {}
+            try:
+                with os.scandir(current_dir) as it:
+                    for entry in it:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False) and match(entry.name):
+                            st = entry.stat(follow_symlinks=False)
+                            files[entry.name] = [st.st_size, st.st_mtime_ns]
+            except OSError as e:
+                print(f"Error scanning {current_dir}: {e}")
+                # Keep what we knew about it rather than reporting removals.
+                return (cached['subdirs'], [(current_dir, None, cached, None, None)]) if cached else ([], [])
+            return subdirs, [(current_dir, mtime, cached, subdirs, files)]
+
+        for current_dir, mtime, cached, subdirs, files in walk_parallel([directory], visit, workers):
+            seen.add(current_dir)
+            if files is None:
+                self.stats['dirs_skipped'] += 1
+                self.stats['files_skipped'] += len(cached['files'])
+                continue
+            self.stats['dirs_scanned'] += 1
+            yield from self._diff(current_dir, cached['files'] if cached else {}, files)
+            dirs[current_dir] = {'mtime': mtime, 'subdirs': subdirs, 'files': files}
+            self.dirty = True
+
+        for gone in set(dirs) - seen:
+            for name in dirs[gone]['files']:
+                self.stats['files_removed'] += 1
+                yield 'removed', os.path.join(gone, name)
+            del dirs[gone]
+            self.dirty = True
+
+    # Cheap check for polling: stats every known directory, lists none.
+    def has_changes(self) -> bool:
+        for directory, cached in list(self.dirs.items()):
+            try:
+                if os.stat(directory).st_mtime_ns != cached['mtime']:
+                    return True
+            except OSError:
+                return True
+        return False
+
+    def _diff(self, directory: str, old: Dict[str, List[int]], new: Dict[str, List[int]]) -> Iterator[Tuple[str, str]]:
+        for name, meta in new.items():
+            previous = old.get(name)
+            if previous == meta:
+                self.stats['files_skipped'] += 1
+                continue
+            if previous is not None:
+                yield 'removed', os.path.join(directory, name)
+            self.stats['files_reprocessed'] += 1
+            yield 'added', os.path.join(directory, name)
+        for name in old.keys() - new.keys():
+            self.stats['files_removed'] += 1
+            yield 'removed', os.path.join(directory, name)
+
+    def summary(self) -> str:
+        s = self.stats
+        return (f"Scan: {s['dirs_skipped']} unchanged directories skipped, {s['dirs_scanned']} rescanned; "
+                f"{s['files_skipped']} files skipped, {s['files_reprocessed']} reprocessed, {s['files_removed']} removed\n")
@@ -0,0 +1,206 @@
+import re
+import bisect
+import threading
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Set
+
+import perf
+
+# Fuzzy scoring every title on every keystroke does not scale, so keep an
+# inverted index of normalized word tokens and their trigrams.  A query is
+# first narrowed down to the titles sharing the most trigrams with it and only
+# those candidates are handed to thefuzz.  Queries that look like a title ID
+# are answered by prefix match on a sorted ID list instead.
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+HEX_RE = re.compile(r'^[0-9a-f]{4,16}$')
+GRAM = 3
+MAX_CANDIDATES = 1000
+# Grams shared by more than this fraction of titles say nothing about a query.
+COMMON_GRAM = 0.2
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall(text.lower())
+
+
+def grams(token: str) -> List[str]:
+    if len(token) <= GRAM:
+        return [token]
+    return [token[i:i + GRAM] for i in range(len(token) - GRAM + 1)]
+
+
+# Indexed on top of the trigrams: the 1 and 2 character prefixes of every
+# token, which is what the first keystrokes of a query look like.
+def index_grams(token: str) -> Set[str]:
+    return set(grams(token)) | {token[:n] for n in range(1, min(GRAM, len(token) + 1))}
+
+
+class SearchIndex:
+    def __init__(self) -> None:
+        self.lock = threading.RLock()
+        self.docs: Dict[str, str] = {}
+        self.doc_grams: Dict[str, Set[str]] = {}
+        self.postings: Dict[str, Set[str]] = {}
+        self.ids: List[tuple] = []
+        self.doc_ids: Dict[str, List[str]] = {}
+        self.pending: Optional[Dict[str, str]] = None
+
+    def clear(self) -> None:
+        with self.lock:
+            self.pending = None
+            self.docs.clear()
+            self.doc_grams.clear()
+            self.postings.clear()
+            self.ids.clear()
+            self.doc_ids.clear()
+
+    # The actual build is deferred until the index is first used, so loading a
+    # library does not pay for it up front (and a CLI `list` never does).
+    def rebuild(self, choices: Dict[str, str]) -> None:
+        with self.lock:
+            self.clear()
+            self.pending = dict(choices)
+
+    def ensure_built(self) -> None:
+        with self.lock:
+            if self.pending is None:
+                return
+            choices, self.pending = self.pending, None
+            for key, text in choices.items():
+                self._add(key, text, self.ids.append)
+            self.ids.sort()
+
+    def add(self, key: str, text: str) -> None:
+        with self.lock:
+            self.ensure_built()
+            if key in self.docs:
+                self.remove(key)
+            self._add(key, text, lambda entry: bisect.insort(self.ids, entry))
+
+    def _add(self, key: str, text: str, add_id: Callable[[tuple], None]) -> None:
+        self.docs[key] = text
+        doc_grams = set()
+        doc_ids = []
+        for token in tokenize(text):
+            doc_grams.update(index_grams(token))
+            # choices are "<name> <titleid>", index the ID for prefix lookups.
+            if len(token) == 16 and HEX_RE.match(token):
+                add_id((token, key))
+                doc_ids.append(token)
+        self.doc_grams[key] = doc_grams
+        self.doc_ids[key] = doc_ids
+        for gram in doc_grams:
+            self.postings.setdefault(gram, set()).add(key)
+
+    def remove(self, key: str) -> None:
+        with self.lock:
+            self.ensure_built()
+            if self.docs.pop(key, None) is None:
+                return
+            for gram in self.doc_grams.pop(key):
+                keys = self.postings.get(gram)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self.postings[gram]
+            for token in self.doc_ids.pop(key):
+                i = bisect.bisect_left(self.ids, (token, key))
+                if i < len(self.ids) and self.ids[i] == (token, key):
+                    del self.ids[i]
+
+    def id_prefix(self, prefix: str, limit: int) -> List[str]:
+        with self.lock:
+            self.ensure_built()
+            i = bisect.bisect_left(self.ids, (prefix,))
+            found = []
+            while i < len(self.ids) and self.ids[i][0].startswith(prefix) and len(found) < limit:
+                if self.ids[i][1] not in found:
+                    found.append(self.ids[i][1])
+                i += 1
+            return found
+
+    def candidates(self, query: str) -> Dict[str, str]:
+        query_grams = set()
+        for token in tokenize(query):
+            query_grams.update(grams(token))
+        with self.lock:
+            self.ensure_built()
+            if not query_grams:
+                return {}
+            postings = [self.postings[g] for g in query_grams if g in self.postings]
+            if not postings:
+                # Nothing shares a gram with the query (initials like "hk",
+                # a typo): score every title, as before the index existed.
+                return dict(self.docs)
+            common = len(self.docs) * COMMON_GRAM
+            selective = [keys for keys in postings if len(keys) <= common] or postings
+            hits = Counter()
+            for keys in selective:
+                hits.update(keys)
+            return {key: self.docs[key] for key, _ in hits.most_common(MAX_CANDIDATES)}
+
+    def search(self, query: str, limit: int = 100) -> List[str]:
+        from thefuzz import fuzz, process
+        query = query.strip()
+        results = []
+        if HEX_RE.match(query.lower()):
+            results = self.id_prefix(query.lower(), limit)
+        if len(results) < limit:
+            choices = self.candidates(query)
+            for _, _, key in process.extract(query, choices, limit=limit, scorer=fuzz.partial_token_sort_ratio):
+                if key not in results:
+                    results.append(key)
+        return results[:limit]
+
+
+# Runs searches off the Tk thread.  Only the most recent query is kept; it is
+# started once no newer one has arrived for `delay` seconds, and results for a
+# query that has since been replaced are dropped instead of delivered.
+class SearchWorker:
+    def __init__(self, index: SearchIndex, delay: float = 0.15, limit: int = 100) -> None:
+        self.index = index
+        self.delay = delay
+        self.limit = limit
+        self.condition = threading.Condition()
+        self.pending: Optional[tuple] = None
+        self.generation = 0
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def submit(self, query: str, callback: Callable[[str, List[str]], None]) -> None:
+        with self.condition:
+            self.generation += 1
+            self.pending = (self.generation, query, callback)
+            self.condition.notify()
+
+    def cancel(self) -> None:
+        with self.condition:
+            self.generation += 1
+            self.pending = None
+
+    def _run(self) -> None:
+        while True:
+            with self.condition:
+                while self.pending is None:
+                    self.condition.wait()
+                generation = self.pending[0]
+                # Debounce: keep waiting while newer queries keep arriving.
+                while True:
+                    self.condition.wait(self.delay)
+                    if self.pending is None or self.pending[0] == generation:
+                        break
+                    generation = self.pending[0]
+                if self.pending is None:
+                    continue
+                generation, query, callback = self.pending
+                self.pending = None
+
+            try:
+                with perf.span('search.query', length=len(query)) as span:
+                    results = self.index.search(query, self.limit)
+                    span.add(results=len(results))
+            except Exception as e:
+                print(f"Error searching: {e}")
+                continue
+            if generation == self.generation:
+                callback(query, results)
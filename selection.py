@@ -0,0 +1,70 @@
+import os
+from typing import Dict, List, Optional, Tuple
+
+from catalog import FILE_TYPES
+from filename_parser import parse_path
+
+# Picks the files a build actually needs from everything the scan found for a
+# title: per title ID (the base, its update, each DLC) only the highest
+# version is kept, and of several copies of that version the smallest, which
+# is normally the compressed one.  Superseded updates and duplicate NSP/NSZ
+# pairs would otherwise all be read and merged by ACORN.
+
+COMPRESSED = ('.nsz', '.xcz')
+
+
+class Selection:
+    def __init__(self) -> None:
+        self.files: List[str] = []
+        self.dropped: List[Tuple[str, str]] = []
+        self.bytes_saved = 0
+
+    def describe(self, name: str) -> str:
+        if not self.dropped:
+            return ''
+        lines = [f"[{name}] Skipping {len(self.dropped)} file(s), {format_size(self.bytes_saved)} less to read:\n"]
+        lines += [f"  {os.path.basename(path)} ({reason})\n" for path, reason in self.dropped]
+        return ''.join(lines)
+
+
+def format_size(size: int) -> str:
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024 or unit == 'GB':
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def _file_size(path: str) -> Optional[int]:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return None
+
+
+def select_files(game: Dict) -> Selection:
+    versions = game.get('versions') or {}
+    selection = Selection()
+    for file_type in FILE_TYPES:
+        # title ID -> [(version, size, path)]
+        groups: Dict[str, list] = {}
+        for path in game.get(file_type, []):
+            rom = parse_path(path)
+            title_id = rom.title_id if rom else path
+            version = versions.get(path, rom.version if rom else 0)
+            groups.setdefault(title_id, []).append((version, _file_size(path), path))
+
+        for copies in groups.values():
+            # Missing files lose to ones that are there; equal sizes go to the
+            # compressed copy.
+            best = max(copies, key=lambda c: (c[0], c[1] is not None, -(c[1] or 0), c[2].lower().endswith(COMPRESSED)))
+            selection.files.append(best[2])
+            for version, size, path in copies:
+                if path == best[2]:
+                    continue
+                if version < best[0]:
+                    reason = f"v{version} superseded by v{best[0]}"
+                else:
+                    reason = f"duplicate of {os.path.basename(best[2])}"
+                selection.dropped.append((path, reason))
+                selection.bytes_saved += size or 0
+    return selection
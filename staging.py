@@ -0,0 +1,269 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+import threading
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Set
+
+from transfer_queue import FINISHED, TransferJob, volume_of
+from watcher import NETWORK_FILESYSTEMS, filesystem_type
+
+# Read-ahead for build inputs that live on a network share.  ACORN reads its
+# inputs in small blocks, which leaves most of an SMB or NFS link idle, so as
+# soon as a job is queued its remote inputs are copied, one job at a time and
+# in large sequential blocks, into a local scratch folder.  While one job is
+# being built the next one is already streaming in.  Scratch space is capped
+# at `budget` bytes; a job that would not fit is built straight off the
+# share, as is a job whose build starts before its staging did.
+#
+# Every copy also feeds BufferTuner, which sizes both the copy blocks and the
+# buffer handed to ACORN from the throughput actually measured per volume.
+
+SCRATCH_PREFIX = 'emurom-stage-'
+MIN_BUFFER = 64 * 1024
+MAX_BUFFER = 16 * 1024 * 1024
+# A read should take about this long at the measured rate.
+TARGET_READ_SECONDS = 0.05
+STALE_SCRATCH_SECONDS = 24 * 60 * 60
+
+QUEUED = 'queued'
+STAGING = 'staging'
+STAGED = 'staged'
+
+
+class BufferTuner:
+    def __init__(self, smoothing: float = 0.3) -> None:
+        self.smoothing = smoothing
+        self.rates: Dict[str, float] = {}
+        self.lock = threading.Lock()
+
+    def observe(self, volume: str, nbytes: int, seconds: float) -> None:
+        if nbytes <= 0 or seconds <= 0:
+            return
+        rate = nbytes / seconds
+        with self.lock:
+            previous = self.rates.get(volume)
+            self.rates[volume] = rate if previous is None else previous + self.smoothing * (rate - previous)
+
+    def buffer_size(self, volume: str, default: int = MIN_BUFFER) -> int:
+        rate = self.rates.get(volume)
+        if rate is None:
+            return default
+        size = MIN_BUFFER
+        while size < MAX_BUFFER and size * 2 <= rate * TARGET_READ_SECONDS:
+            size *= 2
+        return size
+
+    # Times a short sequential read from `path` for a volume nothing has been
+    # measured on yet.
+    def probe(self, path: str, nbytes: int = 4 << 20, block: int = 1 << 20) -> None:
+        try:
+            with open(path, 'rb') as file:
+                start = time.perf_counter()
+                read = 0
+                while read < nbytes:
+                    data = file.read(block)
+                    if not data:
+                        break
+                    read += len(data)
+                self.observe(volume_of(path), read, time.perf_counter() - start)
+        except OSError:
+            pass
+
+    # For a build: sized for the slowest volume the inputs are read from.
+    def buffer_for(self, files: List[str], default: int = MIN_BUFFER) -> int:
+        for path in files:
+            if volume_of(path) not in self.rates:
+                self.probe(path)
+        sizes = [self.buffer_size(volume_of(path), default) for path in files]
+        return min(sizes) if sizes else default
+
+
+_remote: Dict[str, bool] = {}
+
+
+# Cached per directory like volume_of(), so checking every input of a large
+# queue does not re-read /proc/mounts each time.
+def is_remote(path: str) -> bool:
+    directory = os.path.dirname(os.path.abspath(path))
+    if directory not in _remote:
+        if directory.startswith('\\\\'):
+            remote = True
+        elif sys.platform == 'win32':
+            import ctypes
+            drive = os.path.splitdrive(directory)[0]
+            # DRIVE_REMOTE
+            remote = bool(drive) and ctypes.windll.kernel32.GetDriveTypeW(drive + '\\') == 4
+        else:
+            remote = filesystem_type(directory) in NETWORK_FILESYSTEMS
+        _remote[directory] = remote
+    return _remote[directory]
+
+
+class InputStager:
+    def __init__(self, budget: int = 8 << 30, scratch_root: Optional[str] = None,
+                 tuner: Optional[BufferTuner] = None, remote: Callable[[str], bool] = is_remote,
+                 opener: Callable = open) -> None:
+        self.budget = budget
+        self.scratch_root = scratch_root or tempfile.gettempdir()
+        self.tuner = tuner or BufferTuner()
+        self.remote = remote
+        # Injectable so the benchmark can throttle reads.
+        self.opener = opener
+        self.root: Optional[str] = None
+        self.queue: Deque[TransferJob] = deque()
+        self.state: Dict[int, str] = {}
+        self.staged: Dict[int, List[str]] = {}
+        self.reserved: Dict[int, int] = {}
+        # Released while their copy was still running; thrown away once it ends.
+        self.discarded: Set[int] = set()
+        self.used = 0
+        self.condition = threading.Condition()
+        self.thread: Optional[threading.Thread] = None
+        self.closed = False
+
+    def prefetch(self, job: TransferJob) -> None:
+        remote = [path for path in job.files if self.remote(path)]
+        size = sum(os.path.getsize(path) for path in remote if os.path.exists(path))
+        if not remote or size > self.budget:
+            return
+        with self.condition:
+            if self.closed:
+                return
+            self.queue.append(job)
+            self.state[job.id] = QUEUED
+            self.reserved[job.id] = size
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name='input-stager', daemon=True)
+                self.thread.start()
+            self.condition.notify_all()
+
+    # The files to build `job` from: local copies if they are ready, waiting
+    # for a copy already under way, the originals otherwise.
+    def acquire(self, job: TransferJob) -> List[str]:
+        with self.condition:
+            if self.state.get(job.id) == QUEUED:
+                self.queue.remove(job)
+                self._forget(job)
+            while self.state.get(job.id) == STAGING:
+                self.condition.wait()
+            return self.staged.get(job.id, job.files)
+
+    def release(self, job: TransferJob) -> None:
+        with self.condition:
+            state = self.state.get(job.id)
+            if state is None:
+                return
+            if state == STAGING:
+                self.discarded.add(job.id)
+                return
+            if state == QUEUED:
+                self.queue.remove(job)
+            self._forget(job)
+            self.condition.notify_all()
+        if self.root:
+            shutil.rmtree(self._job_dir(job), ignore_errors=True)
+
+    def cleanup(self) -> None:
+        with self.condition:
+            self.closed = True
+            self.queue.clear()
+            self.condition.notify_all()
+        if self.root:
+            shutil.rmtree(self.root, ignore_errors=True)
+
+    def _forget(self, job: TransferJob) -> None:
+        if self.state.pop(job.id, None) == STAGED:
+            self.used -= self.reserved.get(job.id, 0)
+        self.reserved.pop(job.id, None)
+        self.staged.pop(job.id, None)
+
+    def _job_dir(self, job: TransferJob) -> str:
+        return os.path.join(self.root, str(job.id))
+
+    def _ensure_root(self) -> str:
+        if self.root is None:
+            self._remove_stale()
+            self.root = tempfile.mkdtemp(prefix=SCRATCH_PREFIX, dir=self.scratch_root)
+        return self.root
+
+    def _remove_stale(self) -> None:
+        # Left behind by sessions that did not exit cleanly.
+        cutoff = time.time() - STALE_SCRATCH_SECONDS
+        try:
+            with os.scandir(self.scratch_root) as it:
+                for entry in it:
+                    if entry.name.startswith(SCRATCH_PREFIX) and entry.stat().st_mtime < cutoff:
+                        shutil.rmtree(entry.path, ignore_errors=True)
+        except OSError:
+            pass
+
+    def _run(self) -> None:
+        while True:
+            with self.condition:
+                # Oldest job first, once there is room for it.
+                while not self.closed and (not self.queue or self.used + self.reserved[self.queue[0].id] > self.budget):
+                    self.condition.wait()
+                if self.closed:
+                    return
+                job = self.queue.popleft()
+                self.state[job.id] = STAGING
+                self.used += self.reserved[job.id]
+            files = None
+            try:
+                files = self._stage(job)
+            except OSError as e:
+                print(f"[{job.name}] Staging failed, reading from the source instead: {e}")
+            with self.condition:
+                discarded = job.id in self.discarded
+                self.discarded.discard(job.id)
+                if files is None or discarded or job.status in FINISHED or job.cancel_event.is_set() or self.closed:
+                    self.used -= self.reserved.get(job.id, 0)
+                    self.state.pop(job.id, None)
+                    self.reserved.pop(job.id, None)
+                    shutil.rmtree(self._job_dir(job), ignore_errors=True)
+                else:
+                    self.state[job.id] = STAGED
+                    self.staged[job.id] = files
+                self.condition.notify_all()
+
+    def _stage(self, job: TransferJob) -> Optional[List[str]]:
+        directory = os.path.join(self._ensure_root(), str(job.id))
+        os.makedirs(directory, exist_ok=True)
+        staged = []
+        for path in job.files:
+            if not self.remote(path):
+                staged.append(path)
+                continue
+            target = os.path.join(directory, os.path.basename(path))
+            if not self._copy(path, target, job):
+                return None
+            staged.append(target)
+        return staged
+
+    def _copy(self, source: str, target: str, job: TransferJob) -> bool:
+        source_volume = volume_of(source)
+        target_volume = volume_of(target)
+        write_time = 0.0
+        copied = 0
+        with self.opener(source, 'rb') as src, open(target, 'wb') as dst:
+            while True:
+                if job.cancel_event.is_set() or self.closed or job.id in self.discarded:
+                    return False
+                # Re-read every block so the size follows the link speed.
+                size = self.tuner.buffer_size(source_volume, default=1 << 20)
+                start = time.perf_counter()
+                block = src.read(size)
+                read = time.perf_counter() - start
+                if not block:
+                    break
+                dst.write(block)
+                written = time.perf_counter() - start - read
+                self.tuner.observe(source_volume, len(block), read)
+                write_time += written
+                copied += len(block)
+        self.tuner.observe(target_volume, copied, write_time)
+        shutil.copystat(source, target)
+        return True
@@ -0,0 +1,81 @@
+import os
+import sys
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from titles_db import fetch_titles_db, read_download_meta
+
+# fetch_titles_db against a stand-in for the titles host on 127.0.0.1: a 200
+# with an ETag, and a 304 when the request carries that ETag back.
+
+BODY = b'{"0100000000010000": {"name": "Test Game"}}'
+ETAG = '"v1"'
+LAST_MODIFIED = 'Mon, 05 Oct 2026 10:00:00 GMT'
+
+
+class TitlesHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.headers.get('If-None-Match') == ETAG:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(BODY)))
+        self.send_header('ETag', ETAG)
+        self.send_header('Last-Modified', LAST_MODIFIED)
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), TitlesHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}/titles.json"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_200_replaces_file_and_writes_meta(server, tmp_path):
+    path = str(tmp_path / 'titles.json')
+    with open(path, 'wb') as file:
+        file.write(b'{}')
+
+    with requests.Session() as session:
+        assert fetch_titles_db(session, server, path, threading.Lock())
+
+    with open(path, 'rb') as file:
+        assert file.read() == BODY
+    meta = read_download_meta(path)
+    assert meta['etag'] == ETAG
+    assert meta['last_modified'] == LAST_MODIFIED
+    assert not os.path.exists(path + '.part')
+    assert sorted(os.listdir(tmp_path)) == ['titles.json', 'titles.json.meta.json']
+
+
+def test_304_leaves_file_and_updates_checked(server, tmp_path):
+    path = str(tmp_path / 'titles.json')
+    with requests.Session() as session:
+        fetch_titles_db(session, server, path)
+        before = read_download_meta(path)
+        mtime = os.stat(path).st_mtime_ns
+        time.sleep(0.01)
+
+        assert not fetch_titles_db(session, server, path)
+
+    with open(path, 'rb') as file:
+        assert file.read() == BODY
+    assert os.stat(path).st_mtime_ns == mtime
+    after = read_download_meta(path)
+    assert after['etag'] == ETAG
+    assert after['checked'] > before['checked']
+    assert not os.path.exists(path + '.part')
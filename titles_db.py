@@ -0,0 +1,189 @@
+import os
+import json
+import sqlite3
+import time
+import hashlib
+import threading
+import contextlib
+from typing import Dict, Iterable, Optional
+
+# The tinfoil titles.json is several hundred MB and we only ever need a handful
+# of fields for the base titles that are actually in the library.  Convert it
+# once into a small SQLite table keyed by the 13 character title prefix and
+# only redo that when the source file changes.
+
+DOWNLOAD_CHUNK = 1 << 20
+DOWNLOAD_TIMEOUT = (10, 60)
+TITLE_FIELDS = ('id', 'name', 'intro', 'iconUrl', 'size', 'rank', 'region')
+LOOKUP_CHUNK = 500
+
+
+class TitlesIndex:
+    def __init__(self, source_path: str, index_path: str) -> None:
+        self.source_path = source_path
+        self.index_path = index_path
+        # Held while reading the source so a background download cannot swap
+        # it out from under a rebuild.
+        self.lock = threading.Lock()
+
+    def _connect(self, path: Optional[str] = None) -> sqlite3.Connection:
+        return sqlite3.connect(path or self.index_path)
+
+    @staticmethod
+    def _hash_file(path: str) -> str:
+        digest = hashlib.sha1()
+        with open(path, 'rb') as file:
+            for chunk in iter(lambda: file.read(1 << 20), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _read_meta(self) -> Dict[str, str]:
+        if not os.path.exists(self.index_path):
+            return {}
+        try:
+            with self._connect() as conn:
+                return dict(conn.execute("SELECT key, value FROM meta"))
+        except sqlite3.Error:
+            return {}
+
+    def is_current(self) -> bool:
+        meta = self._read_meta()
+        if not meta:
+            return False
+        st = os.stat(self.source_path)
+        if meta.get('mtime') == str(st.st_mtime_ns) and meta.get('source_size') == str(st.st_size):
+            return True
+        # Touched but possibly identical (e.g. re-downloaded), compare content.
+        if meta.get('sha1') != self._hash_file(self.source_path):
+            return False
+        with self._connect() as conn:
+            conn.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                             [('mtime', str(st.st_mtime_ns)), ('source_size', str(st.st_size))])
+        return True
+
+    def build(self) -> None:
+        st = os.stat(self.source_path)
+        sha1 = self._hash_file(self.source_path)
+        with open(self.source_path, 'r') as file:
+            data = json.load(file)
+
+        rows = []
+        for title_data in data.values():
+            title_id = title_data.get('id')
+            # Only base titles (xxx000) carry the metadata shown in the UI.
+            if title_id and title_id[-3:] == '000':
+                rows.append((title_id[:-3],) + tuple(title_data.get(field) for field in TITLE_FIELDS))
+        del data
+
+        tmp_path = self.index_path + '.tmp'
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        conn = self._connect(tmp_path)
+        try:
+            with conn:
+                conn.execute("CREATE TABLE titles (key TEXT PRIMARY KEY, id TEXT, name TEXT, intro TEXT, "
+                             "iconUrl TEXT, size INTEGER, rank INTEGER, region TEXT)")
+                conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+                # Later entries win, same as the old dict.update() merge did.
+                conn.executemany("INSERT OR REPLACE INTO titles VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                conn.executemany("INSERT INTO meta (key, value) VALUES (?, ?)",
+                                 [('mtime', str(st.st_mtime_ns)), ('source_size', str(st.st_size)), ('sha1', sha1)])
+        finally:
+            conn.close()
+        os.replace(tmp_path, self.index_path)
+
+    # Changes whenever the index is rebuilt from different data.
+    def version(self) -> Optional[str]:
+        return self._read_meta().get('sha1')
+
+    def ensure(self) -> bool:
+        if not os.path.exists(self.source_path):
+            return False
+        try:
+            with self.lock:
+                if not self.is_current():
+                    self.build()
+            return True
+        except (json.JSONDecodeError, IOError, sqlite3.Error) as e:
+            print(f"Error indexing titles database: {e}")
+            return False
+
+    def lookup(self, keys: Iterable[str]) -> Dict[str, Dict]:
+        keys = list(keys)
+        found = {}
+        columns = ', '.join(TITLE_FIELDS)
+        with self._connect() as conn:
+            for i in range(0, len(keys), LOOKUP_CHUNK):
+                chunk = keys[i:i + LOOKUP_CHUNK]
+                placeholders = ', '.join('?' * len(chunk))
+                for row in conn.execute(f"SELECT key, {columns} FROM titles WHERE key IN ({placeholders})", chunk):
+                    found[row[0]] = dict(zip(TITLE_FIELDS, row[1:]))
+        return found
+
+
+# Download state (ETag, Last-Modified and when we last asked) lives next to the
+# file so the next request can be conditional.
+
+def _meta_path(path: str) -> str:
+    return path + '.meta.json'
+
+
+def read_download_meta(path: str) -> Dict:
+    try:
+        with open(_meta_path(path), 'r') as file:
+            return json.load(file)
+    except (json.JSONDecodeError, IOError):
+        return {}
+
+
+def _write_download_meta(path: str, meta: Dict) -> None:
+    tmp_path = _meta_path(path) + '.tmp'
+    with open(tmp_path, 'w') as file:
+        json.dump(meta, file)
+    os.replace(tmp_path, _meta_path(path))
+
+
+def titles_db_age(path: str) -> float:
+    checked = read_download_meta(path).get('checked')
+    if checked is None:
+        checked = os.path.getmtime(path) if os.path.exists(path) else 0
+    return time.time() - checked
+
+
+# Fetches `url` into `path` with a conditional GET, streaming the body to a
+# temporary file that replaces `path` only once it is complete.  Returns True
+# if the file changed and False on 304.  `session` is a requests.Session and
+# its exceptions are left to the caller.  `lock` guards the final rename
+# against readers of `path`.
+def fetch_titles_db(session, url: str, path: str, lock=None) -> bool:
+    meta = read_download_meta(path) if os.path.exists(path) else {}
+    headers = {}
+    if meta.get('etag'):
+        headers['If-None-Match'] = meta['etag']
+    if meta.get('last_modified'):
+        headers['If-Modified-Since'] = meta['last_modified']
+
+    with session.get(url, headers=headers, stream=True, timeout=DOWNLOAD_TIMEOUT) as response:
+        if response.status_code == 304:
+            meta['checked'] = time.time()
+            _write_download_meta(path, meta)
+            return False
+        response.raise_for_status()
+
+        part_path = path + '.part'
+        try:
+            with open(part_path, 'wb') as file:
+                for chunk in response.iter_content(DOWNLOAD_CHUNK):
+                    file.write(chunk)
+            with lock or contextlib.nullcontext():
+                os.replace(part_path, path)
+        finally:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+
+        _write_download_meta(path, {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'checked': time.time(),
+        })
+    return True
@@ -0,0 +1,340 @@
+import os
+import re
+import sys
+import time
+import queue
+import shutil
+import tempfile
+import itertools
+import threading
+import multiprocessing
+from collections import Counter
+from typing import Callable, Dict, List, Optional
+
+import perf
+from build_manifest import BuildManifest, fingerprint
+
+# Queue of XCI builds.  Jobs start in the order they were added, up to
+# `max_concurrency` at a time, but a job is held back while another running
+# job is already using one of its volumes (the ones its inputs are read from or
+# the one it writes to) `per_volume_limit` times.  That keeps a NAS and an
+# output disk each busy with one stream instead of seeking between several.
+#
+# Every build runs in its own process and writes into a private staging
+# directory under the output folder, so cancelling a job can stop ACORN for
+# real and throw away whatever it had written so far.
+
+ACORN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ACORN')
+STAGING_PREFIX = '.emurom-'
+POLL_INTERVAL = 0.25
+PERCENT_RE = re.compile(r'(\d{1,3}(?:\.\d+)?)\s*%')
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELED = 'canceled'
+FINISHED = (DONE, FAILED, CANCELED)
+
+_volumes: Dict[str, str] = {}
+
+
+def volume_of(path: str) -> str:
+    path = os.path.abspath(path)
+    directory = os.path.dirname(path) if not os.path.isdir(path) else path
+    if directory in _volumes:
+        return _volumes[directory]
+    drive = os.path.splitdrive(directory)[0]
+    if drive:
+        # C: or \\server\share
+        volume = drive.lower()
+    else:
+        volume = directory
+        while not os.path.ismount(volume) and os.path.dirname(volume) != volume:
+            volume = os.path.dirname(volume)
+    _volumes[directory] = volume
+    return volume
+
+
+class TransferJob:
+    _ids = itertools.count(1)
+
+    def __init__(self, key: str, name: str, files: List[str], output_dir: str,
+                 versions: Optional[Dict[str, int]] = None) -> None:
+        self.id = next(self._ids)
+        self.key = key
+        self.name = name
+        self.files = files
+        self.versions = versions or {}
+        self.output_dir = output_dir
+        self.status = QUEUED
+        self.message = ''
+        self.outputs: List[str] = []
+        self.total_bytes = sum(os.path.getsize(f) for f in files if os.path.exists(f))
+        self.written = 0
+        self.percent: Optional[float] = None
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.cancel_event = threading.Event()
+        self.volumes = {volume_of(f) for f in files} | {volume_of(output_dir)}
+
+    @property
+    def staging_dir(self) -> str:
+        return os.path.join(self.output_dir, f"{STAGING_PREFIX}{self.id}")
+
+    def elapsed(self) -> float:
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.monotonic()) - self.started
+
+    def throughput(self) -> float:
+        elapsed = self.elapsed()
+        return self.written / elapsed if elapsed > 0 else 0.0
+
+    def eta(self) -> Optional[float]:
+        if self.status != RUNNING:
+            return None
+        if self.percent:
+            return self.elapsed() * (100 - self.percent) / self.percent
+        rate = self.throughput()
+        if rate > 0 and self.total_bytes > self.written:
+            # Inputs are compressed so this underestimates, but it moves.
+            return (self.total_bytes - self.written) / rate
+        return None
+
+
+class TransferQueue:
+    def __init__(self, runner: Callable[[TransferJob], None], max_concurrency: int = 1, per_volume_limit: int = 1,
+                 on_change: Optional[Callable[[TransferJob], None]] = None) -> None:
+        self.runner = runner
+        self.max_concurrency = max_concurrency
+        self.per_volume_limit = per_volume_limit
+        self.on_change = on_change
+        self.jobs: List[TransferJob] = []
+        self.lock = threading.Lock()
+
+    def add(self, job: TransferJob) -> TransferJob:
+        with self.lock:
+            self.jobs.append(job)
+        self._changed(job)
+        self._schedule()
+        return job
+
+    def cancel(self, job: TransferJob) -> None:
+        with self.lock:
+            if job.status in FINISHED:
+                return
+            job.cancel_event.set()
+            if job.status == QUEUED:
+                job.status = CANCELED
+        self._changed(job)
+        self._schedule()
+
+    def cancel_all(self) -> None:
+        for job in list(self.jobs):
+            self.cancel(job)
+
+    def active(self) -> List[TransferJob]:
+        with self.lock:
+            return [job for job in self.jobs if job.status not in FINISHED]
+
+    def _changed(self, job: TransferJob) -> None:
+        if self.on_change:
+            self.on_change(job)
+
+    def _schedule(self) -> None:
+        started = []
+        with self.lock:
+            running = [job for job in self.jobs if job.status == RUNNING]
+            in_use = Counter(volume for job in running for volume in job.volumes)
+            for job in self.jobs:
+                if len(running) >= self.max_concurrency:
+                    break
+                if job.status != QUEUED:
+                    continue
+                if any(in_use[volume] >= self.per_volume_limit for volume in job.volumes):
+                    continue
+                job.status = RUNNING
+                job.started = time.monotonic()
+                running.append(job)
+                in_use.update(job.volumes)
+                started.append(job)
+        for job in started:
+            self._changed(job)
+            threading.Thread(target=self._run, args=(job,), daemon=True).start()
+
+    def _run(self, job: TransferJob) -> None:
+        try:
+            self.runner(job)
+        except Exception as e:
+            job.status = FAILED
+            job.message = str(e)
+        finally:
+            with self.lock:
+                if job.status == RUNNING:
+                    job.status = CANCELED if job.cancel_event.is_set() else DONE
+                job.finished = time.monotonic()
+            self._changed(job)
+            self._schedule()
+
+
+def _build_worker(files: List[str], output_folder: str, buffer_size: int, temp_dir: str, messages) -> None:
+    # ACORN's session temp goes under a folder the parent removes, so it is
+    # cleaned up even when the child is terminated on cancel.
+    for name in ('TMPDIR', 'TEMP', 'TMP'):
+        os.environ[name] = temp_dir
+    tempfile.tempdir = temp_dir
+    if ACORN_DIR not in sys.path:
+        sys.path.append(ACORN_DIR)
+    try:
+        from acorn import create_multi_xci, cleanup_session_temp
+    except Exception as e:
+        messages.put(('error', str(e)))
+        return
+    try:
+        result = create_multi_xci(
+            files=files,
+            output_folder=output_folder,
+            text_file=None,
+            buffer_size=buffer_size,
+            progress_callback=lambda msg: messages.put(('log', msg))
+        )
+        messages.put(('result', result))
+    except Exception as e:
+        messages.put(('error', str(e)))
+    finally:
+        # This process owns its own ACORN session temp directory.
+        cleanup_session_temp()
+
+
+def _staged_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def _parse_percent(msg: str) -> Optional[float]:
+    found = PERCENT_RE.findall(msg)
+    if not found:
+        return None
+    value = float(found[-1])
+    return value if value <= 100 else None
+
+
+# Runs create_multi_xci for `job` (reading `files` instead of job.files when
+# given, e.g. local copies) in a child process and returns its result code, or
+# None if the job was cancelled.  Output is built in the job's staging
+# directory and only moved into the output folder once ACORN succeeds; on
+# failure or cancellation the staging directory is removed, along with the
+# temp folder the child ran ACORN under.
+def run_build(job: TransferJob, buffer_size: int, on_message: Callable[[str], None],
+              on_progress: Optional[Callable[[TransferJob], None]] = None,
+              files: Optional[List[str]] = None) -> Optional[int]:
+    context = multiprocessing.get_context('spawn')
+    messages = context.Queue()
+    os.makedirs(job.staging_dir, exist_ok=True)
+    temp_dir = tempfile.mkdtemp(prefix=f"emurom-build-{job.id}-")
+    process = context.Process(target=_build_worker, args=(files or job.files, job.staging_dir, buffer_size, temp_dir,
+                                                          messages), daemon=True)
+    process.start()
+    result = None
+    last_sample = 0.0
+    try:
+        while result is None:
+            if job.cancel_event.is_set():
+                process.terminate()
+                process.join()
+                return None
+            try:
+                kind, value = messages.get(timeout=POLL_INTERVAL)
+                if kind == 'log':
+                    on_message(value)
+                    job.percent = _parse_percent(value) or job.percent
+                elif kind == 'error':
+                    on_message(f"An error occurred: {value}\n")
+                    result = -1
+                else:
+                    result = value
+            except queue.Empty:
+                if not process.is_alive():
+                    # Died without reporting back (crash, out of memory...).
+                    result = -1
+            now = time.monotonic()
+            if now - last_sample >= POLL_INTERVAL:
+                last_sample = now
+                job.written = _staged_size(job.staging_dir)
+                if on_progress:
+                    on_progress(job)
+        process.join()
+
+        if result == 0:
+            for name in os.listdir(job.staging_dir):
+                target = os.path.join(job.output_dir, name)
+                os.replace(os.path.join(job.staging_dir, name), target)
+                job.outputs.append(target)
+        return result
+    finally:
+        shutil.rmtree(job.staging_dir, ignore_errors=True)
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+# The job's input fingerprint and, if the manifest has a build of exactly
+# those inputs, its outputs.
+def _check_manifest(job: TransferJob, manifest: BuildManifest, force: bool) -> tuple:
+    with perf.span('build.fingerprint', files=len(job.files)):
+        inputs = fingerprint(job.files, job.versions)
+        return inputs, None if force else manifest.lookup(job.key, inputs)
+
+
+# Queues the job's inputs for staging, before it is added to the queue,
+# unless its output is already up to date: copying those off a share would
+# only compete with the builds that are running.  build_job() checks again
+# when the job runs.
+def prefetch_job(job: TransferJob, stager, force: bool = False) -> None:
+    _, built = _check_manifest(job, BuildManifest(job.output_dir), force)
+    if not built:
+        stager.prefetch(job)
+
+
+# Everything a runner does for one job, shared by the GUI and the CLI: skip it
+# if the manifest says the output is up to date, otherwise build from the
+# stager's copies (or the originals) with a buffer sized for where they are
+# read from, and record the result.  All outcomes are reported through
+# `on_message`; a failed build also marks the job FAILED.
+def build_job(job: TransferJob, stager, on_message: Callable[[str], None],
+              on_progress: Optional[Callable[[TransferJob], None]] = None,
+              force: bool = False, buffer_size: int = 65536) -> Optional[int]:
+    manifest = BuildManifest(job.output_dir)
+    try:
+        inputs, built = _check_manifest(job, manifest, force)
+        if built:
+            perf.count('build.up_to_date')
+            job.outputs = built
+            on_message(f"[{job.name}] Up to date, skipping build: {', '.join(map(os.path.basename, built))}\n")
+            return 0
+
+        on_message(f"[{job.name}] Starting XCI creation with ACORN...\n")
+        with perf.span('build.stage', key=job.key):
+            files = stager.acquire(job)
+            buffer_size = stager.tuner.buffer_for(files, default=buffer_size)
+        with perf.span('build.xci', key=job.key, files=len(job.files)) as span:
+            # Throughput is input bytes read per second of build.
+            span.bytes = job.total_bytes
+            result = run_build(job, buffer_size, on_message, on_progress=on_progress, files=files)
+            span.add(result=result, written=job.written, buffer_size=buffer_size, staged=files != job.files)
+    finally:
+        stager.release(job)
+    if result is None:
+        on_message(f"[{job.name}] Transfer canceled, partial output removed.\n")
+    elif result == 0:
+        manifest.record(job.key, inputs, job.outputs)
+        on_message(f"[{job.name}] XCI creation completed successfully!\n")
+    else:
+        job.status = FAILED
+        on_message(f"[{job.name}] XCI creation failed.\n")
+    return result
@@ -0,0 +1,105 @@
+import time
+import threading
+import tkinter as tk
+from typing import Callable, List, Optional
+
+# Single channel for getting work from background threads onto the Tk thread.
+# Threads only append to a list; the first append after an idle period asks Tk
+# to drain it, and the drain then runs at most `fps` times a second until the
+# list stays empty.  Log text is joined into one insert per frame and only the
+# last progress value of a frame is applied, so a chatty worker costs one
+# widget update per frame instead of one per message.  Nothing is scheduled
+# while there is nothing to do.
+
+
+class UiDispatcher:
+    def __init__(self, root: tk.Tk, output: Optional[tk.Text] = None, progress_var: Optional[tk.DoubleVar] = None,
+                 fps: int = 20, max_lines: int = 5000) -> None:
+        self.root = root
+        self.output = output
+        self.progress_var = progress_var
+        self.interval = 1.0 / fps
+        self.max_lines = max_lines
+        self.lock = threading.Lock()
+        self.calls: List[tuple] = []
+        self.text: List[str] = []
+        self.progress: Optional[float] = None
+        self.scheduled = False
+        self.last_drain = 0.0
+
+    def post(self, fn: Callable, *args) -> None:
+        with self.lock:
+            self.calls.append((fn, args))
+            wake = self._mark_pending()
+        if wake:
+            self._schedule()
+
+    def log(self, text: str) -> None:
+        with self.lock:
+            self.text.append(text)
+            wake = self._mark_pending()
+        if wake:
+            self._schedule()
+
+    def set_progress(self, value: float) -> None:
+        with self.lock:
+            self.progress = value
+            wake = self._mark_pending()
+        if wake:
+            self._schedule()
+
+    # Schedules a drain for anything posted while scheduling failed.
+    def wake(self) -> None:
+        with self.lock:
+            pending = bool(self.calls or self.text or self.progress is not None)
+            wake = pending and self._mark_pending()
+        if wake:
+            self._schedule()
+
+    def _mark_pending(self) -> bool:
+        if self.scheduled:
+            return False
+        self.scheduled = True
+        return True
+
+    def _schedule(self) -> None:
+        delay = max(0.0, self.interval - (time.monotonic() - self.last_drain))
+        try:
+            self.root.after(int(delay * 1000), self._drain)
+        except (RuntimeError, tk.TclError):
+            # A worker thread posting before mainloop() has started or while
+            # the window is being destroyed.  Clear the flag so the next post
+            # or wake() schedules again instead of every update being dropped.
+            with self.lock:
+                self.scheduled = False
+
+    def _drain(self) -> None:
+        with self.lock:
+            calls, self.calls = self.calls, []
+            text, self.text = self.text, []
+            progress, self.progress = self.progress, None
+
+        try:
+            if text and self.output is not None:
+                self.output.insert(tk.END, ''.join(text))
+                self._trim()
+                self.output.see(tk.END)
+            if progress is not None and self.progress_var is not None:
+                self.progress_var.set(progress)
+            for fn, args in calls:
+                try:
+                    fn(*args)
+                except Exception as e:
+                    print(f"Error in UI callback {getattr(fn, '__name__', fn)}: {e}")
+        finally:
+            self.last_drain = time.monotonic()
+            with self.lock:
+                more = bool(self.calls or self.text or self.progress is not None)
+                self.scheduled = more
+            if more:
+                self._schedule()
+
+    def _trim(self) -> None:
+        lines = int(self.output.index('end-1c').split('.')[0])
+        if lines > self.max_lines:
+            self.output.delete('1.0', f'{lines - self.max_lines + 1}.0')
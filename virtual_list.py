@@ -0,0 +1,120 @@
+import tkinter as tk
+from tkinter import ttk
+from typing import Callable, List, Optional, Sequence, Tuple
+
+# Drives a ttk.Treeview as a window onto an ordered list of keys.  Only the
+# rows that fit in the widget exist; scrolling moves `offset` through `keys`
+# and rewrites those rows in place, so the cost of scrolling and the number of
+# Tk items stay the same no matter how long the list is.
+
+
+class VirtualList:
+    def __init__(self, treeview: ttk.Treeview, scrollbar: ttk.Scrollbar, row: Callable[[str], Tuple[str, tuple]]) -> None:
+        self.treeview = treeview
+        self.scrollbar = scrollbar
+        self.row = row
+        self.keys: Sequence[str] = []
+        self.offset = 0
+        self.rows: List[str] = []
+        self.selected_key: Optional[str] = None
+        self.window = int(treeview.cget('height'))
+        self.on_change: Optional[Callable[[], None]] = None
+
+        scrollbar.configure(command=self.yview)
+        treeview.bind('<MouseWheel>', self.on_mousewheel)
+        treeview.bind('<Button-4>', lambda e: self.scroll(-1))
+        treeview.bind('<Button-5>', lambda e: self.scroll(1))
+        treeview.bind('<Up>', lambda e: self.move_selection(-1))
+        treeview.bind('<Down>', lambda e: self.move_selection(1))
+        treeview.bind('<Prior>', lambda e: self.scroll(-self.window) or 'break')
+        treeview.bind('<Next>', lambda e: self.scroll(self.window) or 'break')
+        treeview.bind('<Home>', lambda e: self.scroll_to(0) or 'break')
+        treeview.bind('<End>', lambda e: self.scroll_to(len(self.keys)) or 'break')
+        treeview.bind('<<TreeviewSelect>>', self.on_select)
+
+    def set_keys(self, keys: Sequence[str], keep_offset: bool = False) -> None:
+        self.keys = keys
+        self.offset = self.offset if keep_offset else 0
+        self.refresh()
+
+    def key_for_row(self, row_id: str) -> Optional[str]:
+        if row_id in self.rows:
+            index = self.offset + self.rows.index(row_id)
+            if index < len(self.keys):
+                return self.keys[index]
+        return None
+
+    def visible_keys(self) -> Sequence[str]:
+        return self.keys[self.offset:self.offset + self.window]
+
+    def scroll(self, rows: int) -> None:
+        self.scroll_to(self.offset + rows)
+
+    def scroll_to(self, offset: int) -> None:
+        offset = max(0, min(offset, len(self.keys) - self.window))
+        if offset != self.offset:
+            self.offset = offset
+            self.refresh()
+
+    def refresh(self) -> None:
+        self.offset = max(0, min(self.offset, len(self.keys) - self.window))
+        visible = self.visible_keys()
+        while len(self.rows) < len(visible):
+            self.rows.append(self.treeview.insert("", tk.END))
+        while len(self.rows) > len(visible):
+            self.treeview.delete(self.rows.pop())
+
+        selected = None
+        for row_id, key in zip(self.rows, visible):
+            text, values = self.row(key)
+            self.treeview.item(row_id, text=text, values=values)
+            if key == self.selected_key:
+                selected = row_id
+        # Selection follows the key, not the recycled row.
+        if selected:
+            self.treeview.selection_set(selected)
+        else:
+            self.treeview.selection_set(())
+
+        total = len(self.keys)
+        if total:
+            self.scrollbar.set(self.offset / total, min(1.0, (self.offset + self.window) / total))
+        else:
+            self.scrollbar.set(0, 1)
+        if self.on_change:
+            self.on_change()
+
+    def yview(self, *args) -> None:
+        if args[0] == 'moveto':
+            self.scroll_to(round(float(args[1]) * len(self.keys)))
+        elif args[0] == 'scroll':
+            amount = int(args[1])
+            self.scroll(amount * self.window if args[2] == 'pages' else amount)
+
+    def on_mousewheel(self, event: tk.Event) -> str:
+        # Windows reports multiples of 120, macOS small deltas.
+        steps = max(1, abs(event.delta) // 120)
+        self.scroll(-steps if event.delta > 0 else steps)
+        return 'break'
+
+    def move_selection(self, step: int) -> str:
+        if not self.keys:
+            return 'break'
+        visible = list(self.visible_keys())
+        if self.selected_key in visible:
+            index = self.offset + visible.index(self.selected_key) + step
+        else:
+            index = self.offset if step > 0 else self.offset + len(visible) - 1
+        index = max(0, min(index, len(self.keys) - 1))
+        self.selected_key = self.keys[index]
+        if index < self.offset:
+            self.offset = index
+        elif index >= self.offset + self.window:
+            self.offset = index - self.window + 1
+        self.refresh()
+        return 'break'
+
+    def on_select(self, event: tk.Event) -> None:
+        selection = self.treeview.selection()
+        if selection:
+            self.selected_key = self.key_for_row(selection[0]) or self.selected_key
@@ -0,0 +1,42 @@
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Iterable, Iterator, List, Tuple, TypeVar
+
+T = TypeVar('T')
+
+# On a network share nearly all of the time spent walking a library is round
+# trip latency, not work, so keep up to `workers` directory listings in flight
+# at once.  `visit` is called on a pool thread for every directory and returns
+# the subdirectories to descend into plus the results for that directory; the
+# results are streamed back to the caller as soon as each listing completes.
+
+DEFAULT_WORKERS = 16
+
+
+def walk_parallel(roots: Iterable[str], visit: Callable[[str], Tuple[List[str], List[T]]], workers: int = DEFAULT_WORKERS) -> Iterator[T]:
+    executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='walker')
+    try:
+        pending = {executor.submit(visit, root) for root in roots}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                subdirs, results = future.result()
+                pending.update(executor.submit(visit, subdir) for subdir in subdirs)
+                yield from results
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def list_matching(directory: str, match: Callable[[str], object]) -> Tuple[List[str], List[str]]:
+    subdirs = []
+    matched = []
+    try:
+        with os.scandir(directory) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                elif entry.is_file(follow_symlinks=False) and match(entry.name):
+                    matched.append(entry.path)
+    except OSError as e:
+        print(f"Error scanning {directory}: {e}")
+    return subdirs, matched
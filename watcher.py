@@ -0,0 +1,185 @@
+import os
+import sys
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+import threading
+from typing import Callable, Dict, Iterable, Optional
+
+# Watches the input folder and calls `on_change` once things have been quiet
+# for `debounce` seconds.  What changed is left to ScanIndex, which only lists
+# the directories whose mtime moved, so the watcher just has to notice that
+# something happened.
+#
+# On Linux local filesystems that is inotify, one watch per directory, with
+# the thread blocked in select() while nothing happens.  Network mounts do not
+# deliver inotify events for changes made by other machines, so there (and on
+# other platforms, or when the watch limit is hit) the known directory mtimes
+# are polled every `poll_interval` seconds instead.
+
+NETWORK_FILESYSTEMS = {'nfs', 'nfs4', 'cifs', 'smb3', 'smbfs', 'afs', '9p', 'ceph', 'davfs',
+                       'fuse.sshfs', 'fuse.rclone', 'fuse.glusterfs'}
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_ISDIR = 0x40000000
+IN_ONLYDIR = 0x01000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = (IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+              | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+EVENT_HEADER = struct.Struct('iIII')
+
+
+def filesystem_type(path: str) -> Optional[str]:
+    try:
+        with open('/proc/mounts', 'r') as file:
+            mounts = [line.split()[1:3] for line in file]
+    except OSError:
+        return None
+    path = os.path.realpath(path)
+    best, fstype = '', None
+    for mount_point, mount_type in mounts:
+        mount_point = mount_point.replace('\\040', ' ')
+        if (path == mount_point or path.startswith(mount_point.rstrip('/') + '/')) and len(mount_point) > len(best):
+            best, fstype = mount_point, mount_type
+    return fstype
+
+
+class Inotify:
+    def __init__(self) -> None:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.paths: Dict[int, str] = {}
+
+    def add(self, path: str) -> None:
+        wd = self._add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            error = ctypes.get_errno()
+            if error in (errno.ENOENT, errno.ENOTDIR, errno.EACCES):
+                return
+            raise OSError(error, f"inotify_add_watch failed for {path}")
+        self.paths[wd] = path
+
+    def add_tree(self, root: str) -> None:
+        for current, _, _ in os.walk(root):
+            self.add(current)
+
+    # Returns the directories created or moved in, which need watches too.
+    def read(self) -> Iterable[str]:
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        new_dirs = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            name = data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip(b'\0')
+            offset += EVENT_HEADER.size + length
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO) and wd in self.paths:
+                new_dirs.append(os.path.join(self.paths[wd], os.fsdecode(name)))
+        return new_dirs
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class LibraryWatcher:
+    def __init__(self, root: str, on_change: Callable[[], None], has_changes: Callable[[], bool],
+                 debounce: float = 2.0, poll_interval: float = 30.0) -> None:
+        self.root = root
+        self.on_change = on_change
+        self.has_changes = has_changes
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.stop_event = threading.Event()
+        # Written to on stop() to get the thread out of select().
+        self.wake_read, self.wake_write = os.pipe()
+        self.lock = threading.Lock()
+        self.closed = False
+        self.mode = 'polling'
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self.thread = threading.Thread(target=self._run, name='library-watch', daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        with self.lock:
+            if self.closed:
+                return
+            self.stop_event.set()
+            os.write(self.wake_write, b'x')
+
+    def _run(self) -> None:
+        inotify = None
+        if sys.platform.startswith('linux') and filesystem_type(self.root) not in NETWORK_FILESYSTEMS:
+            try:
+                inotify = Inotify()
+                inotify.add_tree(self.root)
+                self.mode = 'inotify'
+            except (OSError, AttributeError) as e:
+                print(f"inotify unavailable for {self.root}, polling instead: {e}")
+                if inotify:
+                    inotify.close()
+                inotify = None
+        try:
+            if inotify:
+                self._watch(inotify)
+            else:
+                self._poll()
+        finally:
+            with self.lock:
+                self.stop_event.set()
+                self.closed = True
+                if inotify:
+                    inotify.close()
+                os.close(self.wake_read)
+                os.close(self.wake_write)
+
+    def _watch(self, inotify: Inotify) -> None:
+        while not self.stop_event.is_set():
+            # Blocks until something happens; then keeps reading until the
+            # folder has been quiet for `debounce` seconds.
+            timeout = None
+            changed = False
+            while not self.stop_event.is_set():
+                ready, _, _ = select.select([inotify.fd, self.wake_read], [], [], timeout)
+                if not ready:
+                    break
+                if inotify.fd in ready:
+                    for path in inotify.read():
+                        try:
+                            inotify.add_tree(path)
+                        except OSError as e:
+                            print(f"Could not watch {path}: {e}")
+                    changed = True
+                    timeout = self.debounce
+            if changed and not self.stop_event.is_set():
+                self._notify()
+
+    def _poll(self) -> None:
+        while not self.stop_event.wait(self.poll_interval):
+            if self.has_changes():
+                # Let a copy in progress settle before rescanning.
+                if self.stop_event.wait(self.debounce):
+                    return
+                self._notify()
+
+    def _notify(self) -> None:
+        try:
+            self.on_change()
+        except Exception as e:
+            print(f"Error applying library changes: {e}")